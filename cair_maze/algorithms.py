@@ -1,39 +1,89 @@
 import random
+import numpy as np
 
 
-def randomized_prim(grid, start_position=(0, 0)):
+def randomized_prim(grid, start_position=(0, 0), rng=random):
+    """
+    Randomized Prim's algorithm. Cells live on even coordinates and passages on the odd coordinates between them.
+    The frontier is an array of flat indices, and a random entry is picked in O(1) by swapping it with the last
+    entry before popping, which keeps generation linear in the number of cells.
+    :param grid: numpy array of shape (width, height) that receives the maze (1 = wall, 0 = open)
+    :param start_position: tuple (x, y) of the first carved cell
+    :param rng: random number generator, anything that provides random()
+    :return: None
+    """
     width, height = grid.shape
+    size = width * height
 
     # Start with a grid filled with walls
-    grid.fill(1)
+    cells = bytearray(b"\x01") * size
 
-    frontiers = [(start_position, start_position)]
+    # Each frontier entry packs the passage and the cell behind it as passage * size + cell
+    start = start_position[0] * height + start_position[1]
+    frontiers = [start * size + start]
+    rand = rng.random
 
     while frontiers:
+        i = int(rand() * len(frontiers))
+        entry = frontiers[i]
+        last = frontiers.pop()
+        if i < len(frontiers):
+            frontiers[i] = last
+
+        passage, cell = divmod(entry, size)
+
+        if cells[cell]:
+            cells[passage] = 0
+            cells[cell] = 0
+            x, y = divmod(cell, height)
+
+            if x >= 2 and cells[cell - 2 * height]:
+                frontiers.append((cell - height) * size + cell - 2 * height)
+
+            if x < width - 2 and cells[cell + 2 * height]:
+                frontiers.append((cell + height) * size + cell + 2 * height)
 
-        random.shuffle(frontiers)
-        cell = frontiers.pop()
-        x, y = cell[1]
+            if y >= 2 and cells[cell - 2]:
+                frontiers.append((cell - 1) * size + cell - 2)
 
-        if grid[x, y] == 1:
-            grid[ cell[0]] = 0
-            grid[x, y] = 0
+            if y < height - 2 and cells[cell + 2]:
+                frontiers.append((cell + 1) * size + cell + 2)
 
-            if x >= 2 and grid[x-2, y] == 1:
-                frontiers.append(((x-1, y), (x-2, y)))
+    grid[...] = np.frombuffer(cells, dtype=np.uint8).reshape(width, height)
 
-            if x < width-2 and grid[x+2, y] == 1:
-                frontiers.append(((x+1, y), (x+2, y)))
 
-            if y >= 2 and grid[x, y-2] == 1:
-                frontiers.append(((x, y-1), (x, y-2)))
+def _neighbours(cell, width, height):
+    """
+    Flat indices of the cells two steps away from cell, paired with the passage between them
+    :param cell: flat index (x * height + y) of a cell
+    :param width: width of the grid
+    :param height: height of the grid
+    :return: list of (passage, neighbour) tuples
+    """
+    x, y = divmod(cell, height)
+    neighbours = []
+    if x >= 2:
+        neighbours.append((cell - height, cell - 2 * height))
+    if x < width - 2:
+        neighbours.append((cell + height, cell + 2 * height))
+    if y >= 2:
+        neighbours.append((cell - 1, cell - 2))
+    if y < height - 2:
+        neighbours.append((cell + 1, cell + 2))
+    return neighbours
+
+
+def _maze_cells(width, height):
+    """
+    Flat indices of all cells, the tiles on even coordinates
+    :return: list of flat indices
+    """
+    return [x * height + y for x in range(0, width, 2) for y in range(0, height, 2)]
 
-            if y < height-2 and grid[x, y+2] == 1:
-                frontiers.append(((x, y+1), (x, y+2)))
 
-def recursive_backtracking(grid, cx=0, cy=0):
+def recursive_backtracking(grid, start_position=(0, 0), rng=random):
     """
-    Method:
+    Iterative backtracking (randomized depth-first search).
     1. Choose a starting point in the field.
     2. Randomly choose a wall at that point and carve a passage through to the
         adjacent cell, but only if the adjacent cell has not been visited yet.
@@ -42,75 +92,340 @@ def recursive_backtracking(grid, cx=0, cy=0):
         has uncarved walls and repeat.
     4. The algorithm ends when the process has backed all the way up to the
         starting point.
+    :param grid: numpy array of shape (width, height) that receives the maze (1 = wall, 0 = open)
+    :param start_position: tuple (x, y) of the first carved cell
+    :param rng: random number generator, anything that provides random()
+    :return: None
+    """
+    width, height = grid.shape
+    cells = bytearray(b"\x01") * (width * height)
+    rand = rng.random
+
+    start = start_position[0] * height + start_position[1]
+    cells[start] = 0
+    stack = [start]
+
+    while stack:
+        unvisited = [n for n in _neighbours(stack[-1], width, height) if cells[n[1]]]
+        if not unvisited:
+            stack.pop()
+            continue
+
+        passage, cell = unvisited[int(rand() * len(unvisited))]
+        cells[passage] = 0
+        cells[cell] = 0
+        stack.append(cell)
+
+    grid[...] = np.frombuffer(cells, dtype=np.uint8).reshape(width, height)
+
+
+def wilson(grid, start_position=(0, 0), rng=random):
+    """
+    Wilson's algorithm. Grows the maze with loop-erased random walks, which samples uniformly among all
+    spanning trees of the cell graph.
+    :param grid: numpy array of shape (width, height) that receives the maze (1 = wall, 0 = open)
+    :param start_position: tuple (x, y) of the cell that seeds the tree
+    :param rng: random number generator, anything that provides random()
+    :return: None
+    """
+    width, height = grid.shape
+    cells = bytearray(b"\x01") * (width * height)
+    rand = rng.random
+    neighbours = {cell: _neighbours(cell, width, height) for cell in _maze_cells(width, height)}
+
+    # Last exit taken from each cell during the current walk. Revisiting a cell overwrites its exit,
+    # which erases the loop without any bookkeeping
+    exits = {}
+
+    cells[start_position[0] * height + start_position[1]] = 0
+
+    for origin in neighbours:
+        if not cells[origin]:
+            continue
+
+        cell = origin
+        while cells[cell]:
+            options = neighbours[cell]
+            exits[cell] = options[int(rand() * len(options))]
+            cell = exits[cell][1]
+
+        cell = origin
+        while cells[cell]:
+            passage, nxt = exits[cell]
+            cells[cell] = 0
+            cells[passage] = 0
+            cell = nxt
+
+    grid[...] = np.frombuffer(cells, dtype=np.uint8).reshape(width, height)
+
+
+def kruskal(grid, rng=random):
+    """
+    Randomized Kruskal's algorithm. Walls between cells are removed in random order whenever they separate two
+    different sets, tracked with a union-find array over flat cell indices.
+    :param grid: numpy array of shape (width, height) that receives the maze (1 = wall, 0 = open)
+    :param rng: random number generator, anything that provides shuffle()
+    :return: None
+    """
+    width, height = grid.shape
+    cells = bytearray(b"\x01") * (width * height)
+    parents = list(range(width * height))
+
+    def find(cell):
+        while parents[cell] != cell:
+            parents[cell] = parents[parents[cell]]
+            cell = parents[cell]
+        return cell
+
+    edges = []
+    for cell in _maze_cells(width, height):
+        cells[cell] = 0
+        x, y = divmod(cell, height)
+        if x < width - 2:
+            edges.append((cell + height, cell, cell + 2 * height))
+        if y < height - 2:
+            edges.append((cell + 1, cell, cell + 2))
+    rng.shuffle(edges)
+
+    for passage, a, b in edges:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parents[root_a] = root_b
+            cells[passage] = 0
+
+    grid[...] = np.frombuffer(cells, dtype=np.uint8).reshape(width, height)
+
+
+def eller_rows(width, height, rng=random):
+    """
+    Eller's algorithm as a stream of rows. Only the set membership of the current row of cells is kept,
+    so memory stays O(width) no matter how tall the maze is.
+    :param width: width of the maze in tiles
+    :param height: height of the maze in tiles
+    :param rng: random number generator, anything that provides random()
+    :return: generator of (y, row) tuples where row is a bytearray of width tiles (1 = wall, 0 = open)
+    """
+    rand = rng.random
+    columns = (width + 1) // 2
+    rows = (height + 1) // 2
+
+    # Set id of every cell in the current row. Ids are compacted to range(columns) after each row
+    sets = list(range(columns))
+
+    for cy in range(rows):
+        last = cy == rows - 1
+        parents = list(range(2 * columns))
+
+        def find(s):
+            while parents[s] != s:
+                parents[s] = parents[parents[s]]
+                s = parents[s]
+            return s
+
+        # Cell row: join horizontal neighbours of different sets, always on the last row
+        row = bytearray(b"\x01") * width
+        row[0::2] = bytes(columns)
+        for cx in range(columns - 1):
+            a, b = find(sets[cx]), find(sets[cx + 1])
+            if a != b and (last or rand() < 0.5):
+                parents[a] = b
+                row[2 * cx + 1] = 0
+        sets = [find(s) for s in sets]
+        yield 2 * cy, row
+
+        if last:
+            break
+
+        # Passage row: every set continues downwards through at least one cell
+        row = bytearray(b"\x01") * width
+        members = {}
+        for cx, s in enumerate(sets):
+            members.setdefault(s, []).append(cx)
+
+        next_sets = [None] * columns
+        for s, group in members.items():
+            down = [cx for cx in group if rand() < 0.5]
+            if not down:
+                down = [group[int(rand() * len(group))]]
+            for cx in down:
+                row[2 * cx] = 0
+                next_sets[cx] = s
+        yield 2 * cy + 1, row
+
+        # Cells without a connection from above start in new sets, then ids are compacted again
+        fresh = iter(range(columns, 2 * columns))
+        next_sets = [next(fresh) if s is None else s for s in next_sets]
+        compact = {}
+        sets = [compact.setdefault(s, len(compact)) for s in next_sets]
+
+    # An even height leaves the bottom row as a solid wall, like the other generators
+    if height % 2 == 0:
+        yield height - 1, bytearray(b"\x01") * width
+
+
+def eller(grid, rng=random):
     """
+    Eller's algorithm, generated row by row with eller_rows()
+    :param grid: numpy array of shape (width, height) that receives the maze (1 = wall, 0 = open)
+    :param rng: random number generator, anything that provides random()
+    :return: None
+    """
+    width, height = grid.shape
+    for y, row in eller_rows(width, height, rng=rng):
+        grid[:, y] = np.frombuffer(row, dtype=np.uint8)
 
-    directions = [
-        (0, 1),
-        (0, -1),
-        (1, 0),
-        (-1, 0)
+
+def _batch_directions(width, height):
+    """
+    Flat-index offsets to the cell two steps away in each direction, paired with a bounds test on (x, y)
+    :return: list of (offset, in_bounds(x, y)) tuples
+    """
+    return [
+        (-2 * height, lambda x, y: x >= 2),
+        (2 * height, lambda x, y: x < width - 2),
+        (-2, lambda x, y: y >= 2),
+        (2, lambda x, y: y < height - 2)
     ]
-    cells = [(cx, cy)]
-
-    height, width = grid.shape
-
-    while cells:
-        x, y = cells.pop()
-
-        random.shuffle(directions)
-
-        for dx, dy in directions:
-            nx, ny = dx + x, dy + y
-
-            print(nx, ny)
-
-            within_bounds = True if 0 <= x < width and 0 <= y < height else False
-            if within_bounds and grid[ny, nx] == 0:
-                grid[x, y] += direction
-                grid[nx, ny] += direction.reverse()
-                cells.append((y, x))
-                cells.append((ny, nx))
-                break
-
-"""
- def generate(self, width=10, height=10, complexity=.75, density=.50):
-        # Only odd shapes
-        shape = ((height // 2) * 2 + 1, (width // 2) * 2 + 1)
-
-        # Adjust complexity and density relative to maze size
-        complexity = int(complexity * (5 * (shape[0] + shape[1])))
-        density = int(density * ((shape[0] // 2) * (shape[1] // 2)))
-
-        # Build actual maze
-        Z = np.zeros(shape, dtype=np.int8)
-
-        # Fill borders
-        Z[0, :] = Z[-1, :] = 1
-        Z[:, 0] = Z[:, -1] = 1
-
-        print(density * complexity)
-        # Make aisles
-        for i in range(density):
-            x, y = self.np_rng.random_integers(0, shape[1] // 2) * 2, self.np_rng.random_integers(0, shape[0] // 2) * 2
-            Z[y, x] = 1
-
-            for j in range(complexity):
-                neighbours = []
-                if x > 1:
-                    neighbours.append((y, x - 2))
-                if x < shape[1] - 2:
-                    neighbours.append((y, x + 2))
-                if y > 1:
-                    neighbours.append((y - 2, x))
-                if y < shape[0] - 2:
-                    neighbours.append((y + 2, x))
-                if len(neighbours):
-                    y_, x_ = neighbours[self.np_rng.random_integers(0, len(neighbours) - 1)]
-
-                    if Z[y_, x_] == 0:
-                        Z[y_, x_] = 1
-                        Z[y_ + (y - y_) // 2, x_ + (x - x_) // 2] = 1
-                        x, y = x_, y_
-        return Z
-
-"""
\ No newline at end of file
+
+
+def _batch_randomized_prim(grids, width, height, rng):
+    """
+    Randomized Prim's algorithm for a stack of mazes, all advanced in lockstep. Each maze owns a row of the
+    frontier arrays and one random frontier entry per maze is swap-removed every iteration.
+    :param grids: numpy array of shape (n, width * height) filled with walls
+    :param width: width of the mazes in tiles
+    :param height: height of the mazes in tiles
+    :param rng: numpy Generator
+    :return: None
+    """
+    n = grids.shape[0]
+    directions = _batch_directions(width, height)
+
+    capacity = 4 * ((width + 1) // 2) * ((height + 1) // 2) + 1
+    passages = np.zeros((n, capacity), dtype=np.int32)
+    cells = np.zeros((n, capacity), dtype=np.int32)
+    lengths = np.ones(n, dtype=np.int64)
+
+    while True:
+        rows = np.flatnonzero(lengths)
+        if rows.size == 0:
+            break
+
+        # Swap-remove one random frontier entry per maze
+        lengths[rows] -= 1
+        last = lengths[rows]
+        i = (rng.random(rows.size) * (last + 1)).astype(np.int64)
+        passage, cell = passages[rows, i], cells[rows, i]
+        passages[rows, i] = passages[rows, last]
+        cells[rows, i] = cells[rows, last]
+
+        carve = grids[rows, cell] == 1
+        rows, passage, cell = rows[carve], passage[carve], cell[carve]
+        grids[rows, passage] = 0
+        grids[rows, cell] = 0
+
+        x, y = np.divmod(cell, height)
+        for offset, in_bounds in directions:
+            ok = in_bounds(x, y)
+            ok[ok] = grids[rows[ok], cell[ok] + offset] == 1
+            r = rows[ok]
+            passages[r, lengths[r]] = cell[ok] + offset // 2
+            cells[r, lengths[r]] = cell[ok] + offset
+            lengths[r] += 1
+
+
+def _batch_recursive_backtracking(grids, width, height, rng):
+    """
+    Iterative backtracking for a stack of mazes. Every maze visits each cell exactly once, so all mazes finish
+    after the same number of iterations and no maze idles while the others catch up.
+    :param grids: numpy array of shape (n, width * height) filled with walls
+    :param width: width of the mazes in tiles
+    :param height: height of the mazes in tiles
+    :param rng: numpy Generator
+    :return: None
+    """
+    n = grids.shape[0]
+    directions = _batch_directions(width, height)
+    offsets = np.array([offset for offset, _ in directions])
+
+    n_cells = ((width + 1) // 2) * ((height + 1) // 2)
+    stack = np.zeros((n, n_cells), dtype=np.int32)
+    pointers = np.ones(n, dtype=np.int64)
+    rows = np.arange(n)
+    grids[:, 0] = 0
+
+    for _ in range(2 * n_cells - 1):
+        cell = stack[rows, pointers - 1]
+        x, y = np.divmod(cell, height)
+
+        # Weight every unvisited neighbour with a random key and pick the largest
+        keys = np.zeros((n, 4))
+        for d, (offset, in_bounds) in enumerate(directions):
+            ok = in_bounds(x, y)
+            ok[ok] = grids[rows[ok], cell[ok] + offset] == 1
+            keys[ok, d] = rng.random(np.count_nonzero(ok)) + 1
+
+        direction = keys.argmax(axis=1)
+        advance = keys[rows, direction] > 0
+        pointers[~advance] -= 1
+
+        r = rows[advance]
+        nxt = cell[advance] + offsets[direction[advance]]
+        grids[r, (cell[advance] + nxt) // 2] = 0
+        grids[r, nxt] = 0
+        stack[r, pointers[r]] = nxt
+        pointers[r] += 1
+
+
+def generate_batch(n, width, height, algorithm="randomized_prim", seed=None, out=None):
+    """
+    Generates n mazes into a single (n, width, height) uint8 array.
+    randomized_prim and recursive_backtracking run for all mazes in lockstep with vectorized numpy operations,
+    other algorithms fall back to generating the mazes one by one into slices of the same array.
+    :param n: number of mazes
+    :param width: width of the mazes in tiles
+    :param height: height of the mazes in tiles
+    :param algorithm: the generator algorithm
+    :param seed: seed of the generator, None for a random seed
+    :param out: optional preallocated uint8 array of shape (n, width, height)
+    :return: numpy array of shape (n, width, height) (1 = wall, 0 = open)
+    """
+    if out is None:
+        out = np.empty((n, width, height), dtype=np.uint8)
+    elif out.shape != (n, width, height) or out.dtype != np.uint8:
+        raise ValueError("out must be a uint8 array of shape %s" % ((n, width, height), ))
+
+    rng = np.random.default_rng(seed)
+
+    if algorithm == "none":
+        out.fill(0)
+        return out
+
+    if algorithm in BATCH_ALGORITHMS:
+        out.fill(1)
+        grids = out.reshape(n, width * height)
+        BATCH_ALGORITHMS[algorithm](grids, width, height, rng)
+        if not np.shares_memory(grids, out):
+            out[...] = grids.reshape(n, width, height)
+        return out
+
+    if algorithm not in ALGORITHMS:
+        raise Exception("No maze generation algorithm called %s" % algorithm)
+
+    for i, maze_seed in enumerate(rng.integers(0, 2 ** 63, size=n)):
+        ALGORITHMS[algorithm](out[i], rng=random.Random(int(maze_seed)))
+    return out
+
+
+ALGORITHMS = dict(
+    randomized_prim=randomized_prim,
+    recursive_backtracking=recursive_backtracking,
+    wilson=wilson,
+    kruskal=kruskal,
+    eller=eller
+)
+
+BATCH_ALGORITHMS = dict(
+    randomized_prim=_batch_randomized_prim,
+    recursive_backtracking=_batch_recursive_backtracking
+)
@@ -0,0 +1,215 @@
+import os
+import uuid
+import numpy as np
+
+
+class MazeCorpus:
+    """
+    On-disk maze cache keyed by (algorithm, width, height, seed).
+    Every (algorithm, width, height) combination is stored as a set of structured .npy segments that are
+    memory-mapped on first use. Records hold the grid together with the spawn positions and the optimal
+    path length, and every segment is sorted by seed so a lookup is a binary search per segment over an in-memory
+    copy of its seeds.
+
+    Each flush() writes a new segment under a name that is unique to the writer, so any number of MazeCorpus
+    instances, in one or several processes, can share a directory without a lock and without overwriting each
+    other. Segments written by other instances are picked up on a miss. Once a combination has more than
+    max_segments segments the smaller half is merged, so a record is only rewritten a logarithmic number of times.
+    """
+
+    def __init__(self, directory, flush_every=256, max_segments=16):
+        """
+        :param directory: directory holding the segments, created if missing
+        :param flush_every: number of pending records that triggers an automatic flush()
+        :param max_segments: number of segments per combination that triggers a merge, at least 2
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_every = flush_every
+        self.max_segments = max(2, max_segments)
+        self._writer = "%s-%s" % (os.getpid(), uuid.uuid4().hex[:8])
+        self._written = 0
+        self._shards = {}
+        self._pending = {}
+
+    @staticmethod
+    def dtype(width, height):
+        return np.dtype([
+            ("seed", "<i8"),
+            ("grid", "u1", (width, height)),
+            ("player", "<i4", (2, )),
+            ("target", "<i4", (2, )),
+            ("optimal_path_length", "<i4")
+        ])
+
+    def path(self, algorithm, width, height):
+        """
+        Path of the single shard written by earlier versions, still read as a segment
+        """
+        return os.path.join(self.directory, "%s_%sx%s.npy" % (algorithm, width, height))
+
+    def _segment_path(self, algorithm, width, height):
+        self._written += 1
+        return os.path.join(self.directory, "%s_%sx%s.%s-%s.npy" % (algorithm, width, height, self._writer,
+                                                                    self._written))
+
+    def _segments(self, algorithm, width, height, refresh=False):
+        """
+        Memory-mapped segments of a combination
+        :param refresh: list the directory again to find segments written since the last listing
+        :return: dict of path to (sorted seeds, structured array)
+        """
+        key = (algorithm, width, height)
+        if key in self._shards and not refresh:
+            return self._shards[key]
+
+        prefix = "%s_%sx%s." % key
+        segments = self._shards.get(key, {})
+        listed = set()
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix) or not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            listed.add(path)
+            if path not in segments and not self._add(segments, path):
+                listed.discard(path)
+
+        # Segments that were merged away by another instance
+        for path in set(segments) - listed:
+            del segments[path]
+
+        self._shards[key] = segments
+        return segments
+
+    @staticmethod
+    def _add(segments, path):
+        """
+        Memory-maps a segment together with an in-memory copy of its seeds
+        :return: Boolean, False when another instance has already merged the segment away
+        """
+        try:
+            segment = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return False
+        segments[path] = (np.ascontiguousarray(segment["seed"]), segment)
+        return True
+
+    @staticmethod
+    def _search(segment, seed):
+        seeds, records = segment
+        i = np.searchsorted(seeds, seed)
+        if i < len(seeds) and seeds[i] == seed:
+            return records[i]
+        return None
+
+    def get(self, algorithm, width, height, seed):
+        """
+        Look up a maze
+        :return: structured record with seed, grid, player, target and optimal_path_length fields, or None on a miss
+        """
+        pending = self._pending.get((algorithm, width, height))
+        if pending and seed in pending:
+            return pending[seed]
+
+        for segment in self._segments(algorithm, width, height).values():
+            record = self._search(segment, seed)
+            if record is not None:
+                return record
+
+        # Other instances may have written the maze since the last listing
+        known = set(self._shards[(algorithm, width, height)])
+        for path, segment in self._segments(algorithm, width, height, refresh=True).items():
+            if path not in known:
+                record = self._search(segment, seed)
+                if record is not None:
+                    return record
+        return None
+
+    def put(self, algorithm, width, height, seed, grid, player, target, optimal_path_length):
+        """
+        Add a maze to the corpus. Records are buffered in memory until flush()
+        """
+        record = np.zeros((), dtype=MazeCorpus.dtype(width, height))
+        record["seed"] = seed
+        record["grid"] = grid
+        record["player"] = player
+        record["target"] = target
+        record["optimal_path_length"] = optimal_path_length
+
+        pending = self._pending.setdefault((algorithm, width, height), {})
+        pending[seed] = record
+
+        if sum(len(p) for p in self._pending.values()) >= self.flush_every:
+            self.flush()
+
+    def _write(self, key, records):
+        """
+        Writes records sorted by seed to a new segment, renamed into place once complete
+        :return: path of the segment
+        """
+        records = records[np.argsort(records["seed"], kind="stable")]
+        path = self._segment_path(*key)
+        tmp_path = path + ".tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=records.dtype, shape=records.shape)
+        out[...] = records
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+        return path
+
+    def flush(self):
+        """
+        Write all pending records, one new segment per combination. Existing segments are not rewritten
+        :return: None
+        """
+        for key, pending in self._pending.items():
+            if not pending:
+                continue
+
+            segments = self._segments(*key, refresh=True)
+            self._add(segments, self._write(key, np.stack(list(pending.values()))))
+
+            if len(segments) > self.max_segments:
+                self.merge(*key, count=len(segments) // 2 + 1)
+
+        self._pending.clear()
+
+    def merge(self, algorithm, width, height, count=None):
+        """
+        Merges the smallest segments of a combination into one. Records that appear in several segments are kept
+        once. The merged segment is written before the old ones are removed, so concurrent readers always find the
+        records
+        :param count: number of segments to merge, None for all of them
+        :return: None
+        """
+        key = (algorithm, width, height)
+        segments = self._segments(*key, refresh=True)
+        merged = sorted(segments, key=lambda path: len(segments[path][0]))[:count]
+        if len(merged) < 2:
+            return
+
+        records = np.concatenate([np.asarray(segments[path][1]) for path in merged])
+        records = records[np.unique(records["seed"], return_index=True)[1]]
+        path = self._write(key, records)
+
+        for old_path in merged:
+            del segments[old_path]
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        self._add(segments, path)
+
+    def close(self):
+        """
+        Flush the pending records and release the memory-mapped segments
+        :return: None
+        """
+        self.flush()
+        self._shards.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,42 @@
+import os
+
+
+class PygameDisplay:
+    """
+    Window that shows the frames of the NumpyRenderer. pygame is imported and initialized when the first display is
+    created, so games that never call MazeGame.render() do not load it at all.
+    """
+
+    def __init__(self, screen_size, caption="Deep Maze - v2.0"):
+        """
+        :param screen_size: tuple of w and h value (640, 480)
+        :param caption: window title
+        """
+        if "DISPLAY" not in os.environ:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+        import pygame
+        self.pygame = pygame
+        pygame.init()
+        pygame.display.set_caption(caption)
+        self.screen = pygame.display.set_mode(screen_size, 0, 32)
+
+    def show(self, frame):
+        """
+        Draws a frame to the window
+        :param frame: uint8 numpy array of shape (screen width, screen height, 3), the layout of pygame.surfarray
+        :return: None
+        """
+        self.pygame.surfarray.blit_array(self.screen, frame)
+        self.pygame.display.flip()
+
+    def close(self):
+        """
+        Closes the window and shuts pygame down
+        :return: None
+        """
+        try:
+            self.pygame.display.quit()
+            self.pygame.quit()
+        except:
+            pass
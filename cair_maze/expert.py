@@ -0,0 +1,86 @@
+import os
+from collections import namedtuple
+import numpy as np
+
+from .maze_game import StateType
+from .pathfinding import NO_ACTION
+
+ExpertChunk = namedtuple("ExpertChunk", ["observations", "actions", "rewards", "dones"])
+
+
+def expert_transitions(game, n_steps=None, chunk_size=1024, type=StateType.Array):
+    """
+    Streams transitions of an expert that always takes MazeGame.optimal_action(). Games without an optimal action
+    (player on the target or target unreachable) are reset without recording a transition.
+    Transitions are written into preallocated arrays that are yielded once full. The same arrays are reused for
+    every chunk, so copy a chunk if it has to outlive the next iteration
+    :param game: MazeGame instance with a target
+    :param n_steps: total number of transitions, None to stream forever
+    :param chunk_size: number of transitions per chunk
+    :param type: the StateType of the observations
+    :return: generator of ExpertChunk(observations, actions, rewards, dones)
+    """
+    state = game.reset(type=type)
+    if game.optimal_action() is None:
+        raise ValueError("expert_transitions requires a MazeGame with a target")
+
+    chunk = ExpertChunk(
+        observations=np.empty((chunk_size, ) + np.shape(state), dtype=np.asarray(state).dtype),
+        actions=np.empty(chunk_size, dtype=np.uint8),
+        rewards=np.empty(chunk_size, dtype=np.float32),
+        dones=np.empty(chunk_size, dtype=bool)
+    )
+
+    step = 0
+    while n_steps is None or step < n_steps:
+        size = chunk_size if n_steps is None else min(chunk_size, n_steps - step)
+
+        for i in range(size):
+            # Episodes that spawn on the target or cannot reach it have no expert action and are skipped
+            action = game.optimal_action()
+            while action == NO_ACTION:
+                state = game.reset(type=type)
+                action = game.optimal_action()
+
+            chunk.observations[i] = state
+            chunk.actions[i] = action
+
+            state, chunk.rewards[i], chunk.dones[i], _ = game.step(action, type=type)
+            if game.terminal:
+                state = game.reset(type=type)
+
+        step += size
+        yield chunk if size == chunk_size else ExpertChunk(*(array[:size] for array in chunk))
+
+
+def save_expert_transitions(directory, game, n_steps, chunk_size=1024, type=StateType.Array):
+    """
+    Writes n_steps expert transitions to observations.npy, actions.npy, rewards.npy and dones.npy in a directory.
+    The files are memory-mapped, so memory use is bounded by the chunk size
+    :param directory: destination directory, created if missing
+    :param game: MazeGame instance with a target
+    :param n_steps: total number of transitions
+    :param chunk_size: number of transitions per chunk
+    :param type: the StateType of the observations
+    :return: None
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = None
+    step = 0
+
+    for chunk in expert_transitions(game, n_steps=n_steps, chunk_size=chunk_size, type=type):
+        if files is None:
+            files = [
+                np.lib.format.open_memmap(
+                    os.path.join(directory, "%s.npy" % name), mode="w+", dtype=array.dtype,
+                    shape=(n_steps, ) + array.shape[1:]
+                ) for name, array in chunk._asdict().items()
+            ]
+
+        size = len(chunk.actions)
+        for file, array in zip(files, chunk):
+            file[step:step + size] = array
+        step += size
+
+    for file in files or []:
+        file.flush()
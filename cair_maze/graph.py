@@ -0,0 +1,300 @@
+import heapq
+import numpy as np
+
+from .pathfinding import adjacency
+
+
+class CorridorGraph:
+    """
+    Compressed junction graph of a maze. Nodes are the open tiles that are not plain corridor tiles (dead ends,
+    junctions and isolated tiles), and edges are the corridors between them with their length and tiles.
+    Queries run on the nodes and only expand back to tiles when a path is requested. Perfect mazes compress to a
+    tree, where a shortest path is found by walking both ends up to their common ancestor.
+    """
+
+    def __init__(self, grid, neighbours=None):
+        """
+        Builds the graph with one walk over every corridor
+        :param grid: numpy array of shape (width, height) (1 = wall, 0 = open)
+        :param neighbours: precomputed pathfinding.adjacency(grid), computed when omitted
+        """
+        self.width, self.height = np.shape(grid)
+        if neighbours is None:
+            neighbours = adjacency(grid)
+
+        degree = (neighbours >= 0).sum(axis=1)
+        is_open = np.asarray(grid).ravel() == 0
+        flat = neighbours.tolist()
+
+        # Tile lookups: node id of node tiles, edge id and position along the edge of corridor tiles
+        self.node_of = np.full(len(flat), -1, dtype=np.int64)
+        self.edge_of = np.full(len(flat), -1, dtype=np.int64)
+        self.position_of = np.full(len(flat), -1, dtype=np.int64)
+
+        self.nodes = []
+        self.edges = []  # (u, v, length, tiles strictly between u and v in walking order)
+        self.links = []  # per node: list of (neighbour node, edge id)
+
+        for cell in np.flatnonzero(is_open & (degree != 2)).tolist():
+            self._add_node(cell)
+        for node in range(len(self.nodes)):
+            self._walk_node(node, flat)
+
+        # Cycles made only of corridor tiles have no node yet, promote one of their tiles
+        for cell in np.flatnonzero(is_open & (degree == 2)).tolist():
+            if self.edge_of[cell] < 0 and self.node_of[cell] < 0:
+                self._walk_node(self._add_node(cell), flat)
+
+        self._build_forest()
+
+    def _add_node(self, cell):
+        self.node_of[cell] = len(self.nodes)
+        self.nodes.append(cell)
+        self.links.append([])
+        return len(self.nodes) - 1
+
+    def _walk_node(self, node, flat):
+        """
+        Follows every corridor leaving a node that has not been walked yet
+        """
+        origin = self.nodes[node]
+        for first in flat[origin]:
+            if first < 0 or self.edge_of[first] >= 0:
+                continue
+
+            # Two adjacent nodes share an edge without tiles, it is added from the lower node id
+            if self.node_of[first] >= 0:
+                if self.node_of[first] > node:
+                    self._add_edge(node, int(self.node_of[first]), [])
+                continue
+
+            previous, cell, tiles = origin, first, []
+            while self.node_of[cell] < 0:
+                tiles.append(cell)
+                a, b = [n for n in flat[cell] if n >= 0]
+                previous, cell = cell, (b if a == previous else a)
+
+            edge = self._add_edge(node, int(self.node_of[cell]), tiles)
+            self.edge_of[tiles] = edge
+            self.position_of[tiles] = np.arange(len(tiles))
+
+    def _add_edge(self, u, v, tiles):
+        edge = len(self.edges)
+        self.edges.append((u, v, len(tiles) + 1, tiles))
+        self.links[u].append((v, edge))
+        if u != v:
+            self.links[v].append((u, edge))
+        return edge
+
+    def _build_forest(self):
+        """
+        Labels connected components and, when the graph is a forest, stores parent pointers and root distances
+        """
+        n = len(self.nodes)
+        self.component = [-1] * n
+        self.parent = [-1] * n
+        self.parent_edge = [-1] * n
+        self.depth = [0] * n
+        self.root_distance = [0] * n
+        components = 0
+
+        for root in range(n):
+            if self.component[root] >= 0:
+                continue
+            self.component[root] = components
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                for other, edge in self.links[node]:
+                    if self.component[other] < 0:
+                        self.component[other] = components
+                        self.parent[other] = node
+                        self.parent_edge[other] = edge
+                        self.depth[other] = self.depth[node] + 1
+                        self.root_distance[other] = self.root_distance[node] + self.edges[edge][2]
+                        stack.append(other)
+            components += 1
+
+        self.is_forest = len(self.edges) == n - components
+
+    def _anchors(self, position):
+        """
+        Nodes a tile is attached to
+        :return: list of (node, distance from the tile to the node)
+        """
+        cell = position[0] * self.height + position[1]
+        if self.node_of[cell] >= 0:
+            return [(int(self.node_of[cell]), 0)]
+        if self.edge_of[cell] < 0:
+            return []
+
+        u, v, length, _ = self.edges[self.edge_of[cell]]
+        offset = int(self.position_of[cell]) + 1
+        return [(u, offset), (v, length - offset)]
+
+    def reachable(self, a, b):
+        """
+        Whether two tiles are connected
+        :param a: tuple (x, y)
+        :param b: tuple (x, y)
+        :return: Boolean
+        """
+        anchors_a, anchors_b = self._anchors(a), self._anchors(b)
+        return bool(anchors_a and anchors_b) and self.component[anchors_a[0][0]] == self.component[anchors_b[0][0]]
+
+    def _tree_route(self, u, v):
+        """
+        Node route between two nodes of the same tree, walking both up to their common ancestor
+        :return: list of (node, edge used to reach it) from u to v, the first edge is None
+        """
+        up, down = [], []
+        while self.depth[u] > self.depth[v]:
+            up.append((u, self.parent_edge[u]))
+            u = self.parent[u]
+        while self.depth[v] > self.depth[u]:
+            down.append((v, self.parent_edge[v]))
+            v = self.parent[v]
+        while u != v:
+            up.append((u, self.parent_edge[u]))
+            down.append((v, self.parent_edge[v]))
+            u, v = self.parent[u], self.parent[v]
+
+        route = [(up[0][0], None)] if up else []
+        for (_, edge), (node, _) in zip(up, up[1:] + [(u, None)]):
+            route.append((node, edge))
+        if not route:
+            route = [(u, None)]
+        for node, edge in reversed(down):
+            route.append((node, edge))
+        return route
+
+    def _dijkstra(self, sources, targets):
+        """
+        Dijkstra over the nodes from several sources with initial distances
+        :return: tuple of (distance, target node, route) or None
+        """
+        best, goals = {}, {}
+        for node, d in sources:
+            best[node] = min(d, best.get(node, d))
+        for node, d in targets:
+            goals[node] = min(d, goals.get(node, d))
+        previous = {node: (None, None) for node in best}
+        heap = [(d, node) for node, d in best.items()]
+        heapq.heapify(heap)
+        result = None
+
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > best[node] or (result is not None and d >= result[0]):
+                continue
+            if node in goals and (result is None or d + goals[node] < result[0]):
+                result = (d + goals[node], node)
+            for other, edge in self.links[node]:
+                nd = d + self.edges[edge][2]
+                if nd < best.get(other, nd + 1):
+                    best[other] = nd
+                    previous[other] = (node, edge)
+                    heapq.heappush(heap, (nd, other))
+
+        if result is None:
+            return None
+
+        route, node = [], result[1]
+        while node is not None:
+            parent, edge = previous[node]
+            route.append((node, edge))
+            node = parent
+        route.reverse()
+        return result[0], result[1], route
+
+    def _route(self, a, b):
+        """
+        Shortest route between two tiles
+        :return: tuple of (length, route, anchor_a, anchor_b), route is None when both tiles share a corridor
+        """
+        cell_a, cell_b = a[0] * self.height + a[1], b[0] * self.height + b[1]
+        anchors_a, anchors_b = self._anchors(a), self._anchors(b)
+        if not self.reachable(a, b):
+            return None
+
+        best = None
+        if cell_a == cell_b:
+            best = (0, None, None, None)
+        elif self.edge_of[cell_a] >= 0 and self.edge_of[cell_a] == self.edge_of[cell_b]:
+            best = (abs(int(self.position_of[cell_a]) - int(self.position_of[cell_b])), None, None, None)
+
+        if self.is_forest:
+            for node_a, offset_a in anchors_a:
+                for node_b, offset_b in anchors_b:
+                    u, v = node_a, node_b
+                    while u != v:
+                        if self.depth[u] >= self.depth[v]:
+                            u = self.parent[u]
+                        else:
+                            v = self.parent[v]
+                    length = offset_a + offset_b + self.root_distance[node_a] + self.root_distance[node_b] \
+                        - 2 * self.root_distance[u]
+                    if best is None or length < best[0]:
+                        best = (length, (node_a, node_b), node_a, node_b)
+            if best[1] is not None:
+                best = (best[0], self._tree_route(*best[1]), best[2], best[3])
+        else:
+            found = self._dijkstra(anchors_a, anchors_b)
+            if found is not None and (best is None or found[0] < best[0]):
+                route = found[2]
+                best = (found[0], route, route[0][0], found[1])
+
+        return best
+
+    def shortest_path_length(self, a, b):
+        """
+        Length of the shortest path between two tiles
+        :param a: tuple (x, y)
+        :param b: tuple (x, y)
+        :return: int, None if the tiles are not connected
+        """
+        route = self._route(a, b)
+        return None if route is None else route[0]
+
+    def shortest_path(self, a, b):
+        """
+        Shortest path between two tiles, expanded to tiles
+        :param a: tuple (x, y) of start position
+        :param b: tuple (x, y) of the goal position
+        :return: tuple of (length, path), the same format as pathfinding.shortest_path(), None if not connected
+        """
+        route = self._route(a, b)
+        if route is None:
+            return None
+
+        length, nodes, anchor_a, anchor_b = route
+        cell_a, cell_b = a[0] * self.height + a[1], b[0] * self.height + b[1]
+
+        if nodes is None:
+            # Both tiles lie on the same corridor
+            tiles = self.edges[self.edge_of[cell_a]][3] if cell_a != cell_b else [cell_a]
+            i, j = tiles.index(cell_a), tiles.index(cell_b)
+            cells = tiles[i:j + 1] if i <= j else tiles[j:i + 1][::-1]
+        else:
+            cells = self._corridor(cell_a, anchor_a)
+            for node, edge in nodes[1:]:
+                previous = cells[-1]
+                u, v, _, tiles = self.edges[edge]
+                cells.extend(tiles if self.nodes[u] == previous else tiles[::-1])
+                cells.append(self.nodes[node])
+            cells.extend(self._corridor(cell_b, anchor_b)[::-1][1:])
+
+        return length, [divmod(cell, self.height) for cell in cells]
+
+    def _corridor(self, cell, node):
+        """
+        Tiles from a tile to one of its anchor nodes, both included
+        """
+        if self.node_of[cell] >= 0:
+            return [cell]
+
+        u, v, _, tiles = self.edges[self.edge_of[cell]]
+        i = int(self.position_of[cell])
+        if node == u and not (u == v and i >= len(tiles) // 2):
+            return tiles[i::-1] + [self.nodes[u]]
+        return tiles[i:] + [self.nodes[v]]
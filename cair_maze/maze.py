@@ -3,7 +3,10 @@ import random
 import time
 import numpy as np
 
-from .algorithms import recursive_backtracking, randomized_prim
+from .algorithms import ALGORITHMS, generate_batch
+from .graph import CorridorGraph
+from .packed import PackedGrid
+from .pathfinding import adjacency, distance_field, action_field
 
 
 class ActionSpace:
@@ -21,41 +24,242 @@ class StateSpace:
         self.shape = game.grid.shape
 
 
+SPAWN_POLICIES = ("corners", "random", "distance")
+
+
 class Maze:
     """
     Maze Class, Creates a Maze Instance that contains the internal data of the maze.
     """
-    def __init__(self, width=15, height=15, seed_action=time.time(), maze_algorithm="randomized_prim"):
+    def __init__(self, width=15, height=15, seed_action=time.time(), maze_algorithm="randomized_prim", grid=None,
+                 seed=None, corpus=None, spawn="corners", spawn_min_distance=0):
         """
         Maze Instance, Contains maze generator and the data related to it
         :param width: width of the maze in tiles
         :param height: height of the maze in tiles
         :param seed_action: seed of the action sampler
-        :param maze_algorithm: the generator algorithm. currently supported: randomized_prim
+        :param maze_algorithm: the generator algorithm. currently supported: randomized_prim, recursive_backtracking,
+        wilson, kruskal, eller and none
+        :param grid: an already generated (width, height) uint8 grid, for example a slice of generate_batch().
+        The grid is used as-is (no copy) and generation is skipped
+        :param seed: seed of the maze generator, None for a random maze
+        :param corpus: MazeCorpus that is looked up by (maze_algorithm, width, height, seed) before generating
+        :param spawn: spawn policy of spawn_players(). corners: the open tiles closest to the top-left and
+        bottom-right corners, random: two uniformly random open tiles, distance: a uniformly random pair that is
+        at least spawn_min_distance steps apart
+        :param spawn_min_distance: minimum path length between player and target for the distance policy
         """
+        if spawn not in SPAWN_POLICIES:
+            raise ValueError("No spawn policy called %s" % spawn)
 
         self.width = width
         self.height = height
-        self.grid = np.zeros((width, height), dtype=np.uint8)
+        self.maze_algorithm = maze_algorithm
+        self.seed = seed
+        self.spawn = spawn
+        self.spawn_min_distance = spawn_min_distance
+        self.random = random.Random(seed)
+
+        # Spawn positions are part of a corpus record, so other spawn policies are stored under their own name
+        corpus_algorithm = maze_algorithm
+        if spawn != "corners":
+            corpus_algorithm = "%s+%s%s" % (maze_algorithm, spawn, spawn_min_distance if spawn == "distance" else "")
+        self.key = None if seed is None else (corpus_algorithm, width, height, seed)
+
+        # Spawn positions and optimal path length, only known up front when the maze comes from a corpus or a
+        # prefetcher
+        self.player = None
+        self.target = None
+        self.optimal_path_length = None
+        self.cached = False
+        self._adjacency = None
+        self._open_cells = None
+        self._corridor_graph = None
+
+        # Distance to the target and optimal action of every tile, filled in by solve()
+        self.distance_field = None
+        self.action_field = None
+
+        record = None
+        if grid is None and corpus is not None and seed is not None:
+            record = corpus.get(*self.key)
+
+        if record is not None:
+            self.grid = record["grid"]
+            self.player = tuple(int(v) for v in record["player"])
+            self.target = tuple(int(v) for v in record["target"])
+            self.optimal_path_length = int(record["optimal_path_length"])
+            self.cached = True
+        elif grid is None:
+            self.grid = np.zeros((width, height), dtype=np.uint8)
+
+            # Generate the maze structure
+            self._generate()
+        else:
+            if grid.shape != (width, height):
+                raise ValueError("grid must have shape %s, got %s" % ((width, height), grid.shape))
+            self.grid = grid
+
         self.action_space = ActionSpace(seed=seed_action)
         self.state_space = StateSpace(self)
-        self.maze_algorithm = maze_algorithm
 
-        # Generate the maze structure
-        self._generate()
+    @staticmethod
+    def generate_batch(n, width=15, height=15, maze_algorithm="randomized_prim", seed=None):
+        """
+        Generates n mazes into one stacked (n, width, height) uint8 array and wraps each slice in a Maze
+        :param n: number of mazes
+        :param width: width of the mazes in tiles
+        :param height: height of the mazes in tiles
+        :param maze_algorithm: the generator algorithm
+        :param seed: seed of the generator, None for a random seed
+        :return: list of Maze instances that share the stacked array
+        """
+        grids = generate_batch(n, width, height, algorithm=maze_algorithm, seed=seed)
+        return [Maze(width=width, height=height, maze_algorithm=maze_algorithm, grid=grid) for grid in grids]
+
+    @staticmethod
+    def open_packed(path):
+        """
+        Opens a maze written by cair_maze.packed.generate_packed(). The file is memory-mapped and rows are only
+        read from disk when they are indexed. MazeGame (maze_file option) unpacks the whole grid, so it does not play
+        mazes larger than RAM
+        :param path: path of the packed maze file
+        :return: Maze instance backed by a PackedGrid
+        """
+        grid = PackedGrid(path)
+        return Maze(width=grid.shape[0], height=grid.shape[1], maze_algorithm="eller", grid=grid)
 
     def _generate(self):
         """
         Generates the maze based on which algorithm was defined in the constructor
         :return: None
         """
-        if self.maze_algorithm == "recursive_backtracking":
-            recursive_backtracking(self.grid)
-        elif self.maze_algorithm == "randomized_prim":
-            randomized_prim(self.grid)
-        elif self.maze_algorithm == "none":
+        if self.maze_algorithm == "none":
             pass
+        elif self.maze_algorithm in ALGORITHMS:
+            ALGORITHMS[self.maze_algorithm](self.grid, rng=self.random)
         else:
             raise Exception("No maze generation algorithm called %s" % self.maze_algorithm)
 
+    @property
+    def adjacency(self):
+        """
+        Flat-index adjacency of the open tiles, see cair_maze.pathfinding.adjacency(). Built on first access
+        """
+        if self._adjacency is None:
+            self._adjacency = adjacency(self.grid)
+        return self._adjacency
+
+    def solve(self, target):
+        """
+        Runs a single reverse breadth-first-search from the target and stores the distance and action fields
+        :param target: tuple (x, y) of the target position
+        :return: None
+        """
+        self.distance_field = distance_field(self.grid, target, neighbours=self.adjacency)
+        self.action_field = action_field(self.distance_field)
+
+    @property
+    def corridor_graph(self):
+        """
+        Compressed junction graph for shortest-path and reachability queries, see cair_maze.graph.CorridorGraph.
+        Built on first access
+        """
+        if self._corridor_graph is None:
+            self._corridor_graph = CorridorGraph(self.grid, neighbours=self.adjacency)
+        return self._corridor_graph
+
+    @property
+    def open_cells(self):
+        """
+        Sorted flat indices (x * height + y) of all open tiles. Built on first access
+        """
+        if self._open_cells is None:
+            self._open_cells = np.flatnonzero(np.asarray(self.grid).ravel() == 0)
+        return self._open_cells
+
+    def _nearest_open(self, position):
+        """
+        Open tile closest to a position (manhattan distance). Searches growing windows around the position,
+        so mazes with an open tile near the position are never scanned in full
+        :param position: tuple (x, y)
+        :return: tuple (x, y), None if the maze has no open tile
+        """
+        x, y = position
+        radius = 1
+        while True:
+            x0, y0 = max(0, x - radius), max(0, y - radius)
+            x1, y1 = min(self.width, x + radius + 1), min(self.height, y + radius + 1)
+            covers_grid = x0 == 0 and y0 == 0 and x1 == self.width and y1 == self.height
+
+            xs, ys = np.nonzero(np.asarray(self.grid[x0:x1, y0:y1]) == 0)
+            if xs.size:
+                distances = np.abs(xs + x0 - x) + np.abs(ys + y0 - y)
+                i = np.argmin(distances)
+
+                # Tiles outside the window are at least radius + 1 away
+                if distances[i] <= radius or covers_grid:
+                    return int(xs[i] + x0), int(ys[i] + y0)
+
+            if covers_grid:
+                return None
+            radius *= 2
+
+    def _random_open(self, exclude=None):
+        """
+        Uniformly random open tile
+        :param exclude: flat index of an open tile that is never drawn
+        :return: flat index of the tile
+        """
+        cells = self.open_cells
+        if exclude is None:
+            return int(cells[int(self.random.random() * len(cells))])
+
+        # Draw among the other tiles and shift the draw past the excluded one
+        i = int(self.random.random() * (len(cells) - 1))
+        return int(cells[i + (i >= np.searchsorted(cells, exclude))])
+
+    def spawn_players(self):
+        """
+        Spawns the players according to the spawn policy
+        :return: list of the (x, y) player and target positions
+        """
+        if self.spawn == "corners":
+            return [self._nearest_open((0, 0)), self._nearest_open((self.width - 1, self.height - 1))]
+
+        if len(self.open_cells) < 2:
+            raise ValueError("The %s spawn policy needs at least two open tiles" % self.spawn)
+
+        player = self._random_open()
+        if self.spawn == "random":
+            return [divmod(player, self.height), divmod(self._random_open(exclude=player), self.height)]
+
+        # distance: draw the target among the tiles that are far enough away, or the farthest tile if none are
+        distances = distance_field(self.grid, divmod(player, self.height), neighbours=self.adjacency).ravel()
+        candidates = np.flatnonzero(distances >= max(1, self.spawn_min_distance))
+        if candidates.size == 0:
+            candidates = np.flatnonzero(distances == distances.max())
+        target = divmod(int(candidates[int(self.random.random() * candidates.size)]), self.height)
+        return [divmod(player, self.height), target]
+
+    def legal_directions(self, x, y):
+        """
+        Retrieve legal direction of current position
+        :param x: x coordinate of the position
+        :param y: y coordinate of the position
+        :return: List of legal positions
+        """
+        legal = []
+
+        possible_moves = [
+            (x, y + 1),  # Down
+            (x, y - 1),  # Up
+            (x + 1, y),  # Left
+            (x - 1, y)  # Right
+        ]
+
+        for x, y in possible_moves:
+            if 0 <= x < self.width and 0 <= y < self.height and self.grid[x, y] == 0:
+                legal.append((x, y))
 
+        return legal
@@ -1,12 +1,14 @@
-import pygame
-from collections import deque
-from skimage import color, transform, exposure
+import random
 from math import ceil
 import numpy as np
 from .maze import Maze
-from .pathfinding import dfs
-from .mechanics import TimedPOMDPMaze, POMDPMaze, POMDPLimitedMaze, NormalMaze, TimedPOMDPLimitedMaze
-import os
+from .corpus import MazeCorpus
+from .packed import PackedGrid
+from .display import PygameDisplay
+from .render import NumpyRenderer, PALETTE_COLORS, FLOOR, WALL
+from .pathfinding import follow_actions
+from .mechanics import TimedPOMDPMaze, POMDPMaze, POMDPLimitedMaze, NormalMaze, TimedPOMDPLimitedMaze, \
+    POMDPExploredMaze, POMDPLimitedExploredMaze, get_mechanic, create_mechanic
 
 class StateType:
     ImageRGB = 0
@@ -15,12 +17,52 @@ class StateType:
     ArrayFlat = 3
     DEFAULT = 0
 
+class LazyState:
+    """
+    Observation handle returned by MazeGame.step() and MazeGame.reset() with the lazy_state option.
+    The positions and tiles it needs are snapshotted on creation, the array is only built on first access and cached
+    """
+    __slots__ = ("game", "type", "grid", "player", "target", "indices", "_state")
+
+    def __init__(self, game, type):
+        """
+        :param game: MazeGame instance
+        :param type: the StateType of the observation
+        """
+        self.game = game
+        self.type = type
+        self.grid = game.maze.grid
+        self.player = game.player
+        self.target = game.target
+        is_image = type == StateType.ImageRGB or type == StateType.ImageGrayScale
+        self.indices = game.renderer.tile_indices() if is_image else None
+        self._state = None
+
+    def get(self):
+        """
+        Builds the observation on first call
+        :return: A numpy formatted state representation
+        """
+        if self._state is None:
+            self._state = self.game.get_state(type=self.type, snapshot=self)
+        return self._state
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.get(), dtype=dtype)
+
+    @property
+    def shape(self):
+        return self.get().shape
+
+
 class MazeGame:
     NormalMaze = NormalMaze
     POMDPMaze = POMDPMaze
     POMDPLimitedMaze = POMDPLimitedMaze
     TimedPOMDPMaze = TimedPOMDPMaze
     TimedPOMDPLimitedMaze = TimedPOMDPLimitedMaze
+    POMDPExploredMaze = POMDPExploredMaze
+    POMDPLimitedExploredMaze = POMDPLimitedExploredMaze
 
     def __init__(self, maze_size,
                  screen_size=(640, 480),
@@ -33,41 +75,64 @@ class MazeGame:
         MazeGame Constructor that creates a full maze-game environment
         :param maze_size: tuple of w and h value (10, 10)
         :param screen_size: tuple of w and h value (640, 480)
-        :param mechanic: A uninitialized class that inherits the BaseMechanic class. default is None
-        :param mechanic_args: A dict of properties sent to the mechanic class, default is None
+        :param mechanic: A uninitialized class that inherits the BaseMechanic class, or the name of a registered
+        mechanic (see cair_maze.mechanics.MECHANICS). default is NormalMaze
+        :param mechanic_args: A dict of properties sent to the mechanic class, default is None. With a registered
+        name, None means the default_args of the mechanic
         :param colors: dict(
             goal=(255, 0, 0),
             player=(0, 255, 0),
             wall=(255, 255, 255),
             floor=(0, 0, 0)
         )
+        :param options: dict(
+            algorithm="randomized_prim",  # maze generator, see cair_maze.algorithms.ALGORITHMS
+            disable_target=False,  # spawn only the player
+            maze_file=None,  # path of a cair_maze.packed file played instead of a generated maze, loaded into memory.
+                             # Its size replaces maze_size
+            seed=None,  # seed of the per-reset maze seeds
+            corpus=None,  # MazeCorpus or directory, mazes are loaded from it on a hit and added to it on a miss
+            prefetch=0,  # number of mazes generated and solved ahead of time by a background process pool
+            prefetch_workers=None,  # number of prefetch processes, defaults to the number of cores
+            spawn="corners",  # spawn policy: corners, random or distance, see Maze
+            spawn_min_distance=0,  # minimum player to target path length of the distance spawn policy
+            observation_view=False,  # return read-only views of the frame buffer instead of copies
+            observation_size=None,  # (w, h) of uint8 image observations rasterized at that size
+            lazy_state=False  # step() and reset() return a LazyState that builds the observation on first access
+        )
         """
         #############################################################
         ##
         # Input Manipulation
         ##
         #############################################################
-        mechanic_args = {} if mechanic_args is None else mechanic_args
         colors = {} if colors is None else colors
         self.options = dict(
             algorithm="randomized_prim",
-            disable_target=False
+            disable_target=False,
+            maze_file=None,
+            seed=None,
+            corpus=None,
+            prefetch=0,
+            prefetch_workers=None,
+            spawn="corners",
+            spawn_min_distance=0,
+            observation_view=False,
+            observation_size=None,
+            lazy_state=False
         )
         if options:
             self.options.update(options)
 
+        # Per-reset maze seeds are drawn from this generator when a seed or a corpus is configured
+        self.seed_random = random.Random(self.options["seed"])
+        self.corpus = self.options["corpus"]
+        if isinstance(self.corpus, str):
+            self.corpus = MazeCorpus(self.corpus)
 
-
-        #############################################################
-        ##
-        # Pygame Initialization
-        ##
-        #############################################################
-        if "DISPLAY" not in os.environ:
-            os.environ['SDL_VIDEODRIVER'] = 'dummy'
-        pygame.init()
-        pygame.font.init()
-        pygame.display.set_caption("Deep Maze - v2.0")
+        # A maze file brings its own size, read from the header without unpacking the grid
+        if self.options["maze_file"]:
+            maze_size = PackedGrid(self.options["maze_file"]).shape
 
         #############################################################
         ##
@@ -86,24 +151,23 @@ class MazeGame:
 
         #############################################################
         ##
-        # Pygame & Surface & Window
+        # Display
         ##
         #############################################################
-        self.screen = pygame.display.set_mode(screen_size, 0, 32)
-        self.surface = pygame.Surface(self.screen.get_size()).convert()
-        self.font = pygame.font.SysFont("Arial", size=16)
+        # The pygame window and the renderer are only created once an image or render() is requested
+        self.screen_size = screen_size
+        self.display = None
+        self._renderer = None
 
         #############################################################
         ##
-        # Sprite Definition
+        # Tile Definition
         ##
         #############################################################
-        self.sprite_maze = [Sprite(color=(0, 0, 0), x=x, w=self.tile_width, y=y, h=self.tile_height) for y in
-                            range(self.width) for x in range(self.height)]
-        self.sprite_player = Sprite(color=(0, 255, 0), x=0, y=0, w=self.tile_width, h=self.tile_height)
-        self.sprite_target = Sprite(color=(255, 0, 0), x=0, y=0, w=self.tile_width, h=self.tile_height)
-        self.sprites = pygame.sprite.LayeredUpdates(self.sprite_maze, [self.sprite_target, self.sprite_player])
-        self.rectangles = []
+        # Every tile is an index into the palette (see cair_maze.render), the mechanics overwrite tiles with FOG
+        self.palette = np.array([self.colors[name] for name in PALETTE_COLORS] + [(105, 105, 105)], dtype=np.uint8)
+        self.maze_tiles = None
+        self.tiles = None
 
         #############################################################
         ##
@@ -111,9 +175,29 @@ class MazeGame:
         ##
         #############################################################
         self.maze = None
-        self.maze_optimal_path = None
+        self._maze_optimal_path = None
         self.maze_optimal_path_length = None
 
+        # Grid of the maze_file option. The tile state, distance field and line of sight cover every tile, so the
+        # file is unpacked once on the first reset and shared by every episode
+        self._maze_file_grid = None
+
+        # Seeded mazes are generated inline, so prefetching only applies to unseeded resets
+        self.prefetcher = None
+        if self.options["prefetch"] and self.options["seed"] is None and self.corpus is None \
+                and not self.options["maze_file"]:
+            # The process pool machinery is only imported by games that prefetch
+            from .prefetch import MazePrefetcher
+            self.prefetcher = MazePrefetcher(
+                self.width, self.height,
+                algorithm=self.options["algorithm"],
+                depth=self.options["prefetch"],
+                workers=self.options["prefetch_workers"],
+                solve=not self.options["disable_target"],
+                spawn=self.options["spawn"],
+                spawn_min_distance=self.options["spawn_min_distance"]
+            )
+
         #############################################################
         ##
         # Player & Target Definition
@@ -128,74 +212,183 @@ class MazeGame:
         # Game Mechanics
         ##
         #############################################################
-        self.mechanic = mechanic(self, **mechanic_args)
+        # A registered name without mechanic_args uses the default_args of the registry
+        if isinstance(mechanic, str):
+            mechanic = get_mechanic(mechanic)
+            if mechanic_args is None:
+                mechanic_args = mechanic.default_args
+        mechanic_args = {} if mechanic_args is None else mechanic_args
+        self.mechanic = create_mechanic(mechanic, self, mechanic_args)
 
-        # Reset the game
-        self.reset()
+        # Reset the game, without rendering the discarded first state
+        self.reset(type=StateType.Array)
+
+    @property
+    def renderer(self):
+        """
+        NumpyRenderer of the image observations, created on first use
+        """
+        if self._renderer is None:
+            self._renderer = NumpyRenderer(self, self.screen_size)
+        return self._renderer
 
-    def get_state(self, type=StateType.DEFAULT, resize=None):
+    def get_state(self, type=StateType.DEFAULT, resize=None, out=None, snapshot=None):
         """
         Retrieve a state representation. This can be configured using MazeGame.set_preprocess(preprocess=dict)
+        :param out: optional array the state is written into instead of allocating a new one
+        :param snapshot: LazyState whose positions and tiles are used instead of the current ones
         :return: A numpy formatted state representation
         """
+        indices = None if snapshot is None else snapshot.indices
 
-        if type == StateType.ImageRGB or type == StateType.ImageGrayScale:
-            state = pygame.surfarray.pixels3d(self.surface)
-            state = np.array(state, dtype=np.uint8)
+        if (type == StateType.ImageRGB or type == StateType.ImageGrayScale) and self.options["observation_size"]:
+            state = self.renderer.render_resized(
+                self.options["observation_size"], type == StateType.ImageGrayScale, indices=indices
+            )
+            state = state[:, ::-1]
+            if out is not None:
+                np.copyto(out, state)
+                state = out
+
+        elif type == StateType.ImageRGB or type == StateType.ImageGrayScale:
+            # A view into the renderer's frame buffer, copied below unless views were asked for
+            state = self.renderer.render(indices=indices)
 
             if resize:
+                from skimage import transform
                 state = transform.resize(state, resize, mode='constant')
 
             if type == StateType.ImageGrayScale:
+                from skimage import color
                 state = color.rgb2gray(state)
 
             state = state[:, ::-1]
 
+            if out is not None:
+                np.copyto(out, state)
+                state = out
+            elif state.base is self.renderer.frame:
+                if self.options["observation_view"]:
+                    state = state.view()
+                    state.flags.writeable = False
+                else:
+                    state = state.copy()
+
         elif type == StateType.Array or type == StateType.ArrayFlat:
-            state = np.array(self.maze.grid, copy=True)
-            state[self.player[0], self.player[1]] = 2
-            state[self.target[0], self.target[1]] = 3
+            grid, player, target = (self.maze.grid, self.player, self.target) if snapshot is None else \
+                (snapshot.grid, snapshot.player, snapshot.target)
+            if out is not None:
+                state = out.reshape(self.width, self.height)
+                np.copyto(state, grid)
+            else:
+                state = np.array(grid, copy=True)
+            state[player[0], player[1]] = 2
+            state[target[0], target[1]] = 3
 
             if type == StateType.ArrayFlat:
-                state = state.flatten()
+                state = state.reshape(-1) if out is not None else state.flatten()
+            if out is not None:
+                state = out
         else:
             raise RuntimeError("Unknown Type")
 
         return state
 
-    def reset(self, type=StateType.DEFAULT):
+    @property
+    def distance_field(self):
         """
-        Resets the game-state
-        :return: The State
+        Distance to the target from every tile (int32, -1 for walls and unreachable tiles), None without a target.
+        Computed once per maze by a single reverse breadth-first-search from the target
         """
-        # Create new maze
-        self.maze = Maze(width=self.width, height=self.height, maze_algorithm=self.options["algorithm"])
+        if self.maze is None or self.options["disable_target"]:
+            return None
+        if self.maze.distance_field is None:
+            self.maze.solve(self.target)
+        return self.maze.distance_field
+
+    @property
+    def action_field(self):
+        """
+        Optimal action of every tile (uint8, pathfinding.NO_ACTION where there is none), None without a target
+        """
+        return None if self.distance_field is None else self.maze.action_field
+
+    @property
+    def maze_optimal_path(self):
+        """
+        Tuple of (length, path) for the shortest path from the spawn position to the target.
+        Walked from the action field on first access
+        """
+        if self._maze_optimal_path is None and self.distance_field is not None:
+            self._maze_optimal_path = follow_actions(self.distance_field, self.action_field, self.maze.player)
+        return self._maze_optimal_path
+
+    def distance_to_goal(self, position=None):
+        """
+        Shortest distance from a position to the target
+        :param position: tuple (x, y), defaults to the player position
+        :return: int, -1 if the target is unreachable, None without a target
+        """
+        x, y = self.player if position is None else position
+        return None if self.distance_field is None else int(self.distance_field[x, y])
 
-        # Update sprite color reflecting the maze state
-        for i in range(self.width * self.height):
-            x = i % self.width
-            y = int((i - x) / self.width)
+    def optimal_action(self, position=None):
+        """
+        Action that moves one step closer to the target
+        :param position: tuple (x, y), defaults to the player position
+        :return: int action, pathfinding.NO_ACTION on the target or an unreachable tile, None without a target
+        """
+        x, y = self.player if position is None else position
+        return None if self.action_field is None else int(self.action_field[x, y])
 
-            sprite = self.sprites.get_sprite(i)
-            color = self.colors["wall"] if self.maze.grid[x, y] == 0 else self.colors["floor"]
-            sprite.set_color(color)
-            sprite.original_color = color
+    def reset(self, type=StateType.DEFAULT, seed=None):
+        """
+        Resets the game-state
+        :param seed: seed of the new maze. Defaults to the next seed of the seed option when a seed or corpus is set
+        :return: The State
+        """
+        if seed is None and (self.options["seed"] is not None or self.corpus is not None):
+            seed = self.seed_random.getrandbits(63)
 
+        # Create new maze
+        if self.options["maze_file"]:
+            if self._maze_file_grid is None:
+                self._maze_file_grid = np.asarray(Maze.open_packed(self.options["maze_file"]).grid)
+            self.maze = Maze(width=self._maze_file_grid.shape[0], height=self._maze_file_grid.shape[1],
+                             maze_algorithm="eller", grid=self._maze_file_grid, spawn=self.options["spawn"],
+                             spawn_min_distance=self.options["spawn_min_distance"])
+        else:
+            prefetched = self.prefetcher.get() if self.prefetcher is not None and seed is None else None
+            if prefetched is not None:
+                self.maze = prefetched
+            else:
+                self.maze = Maze(width=self.width, height=self.height, maze_algorithm=self.options["algorithm"],
+                                 seed=seed, corpus=self.corpus, spawn=self.options["spawn"],
+                                 spawn_min_distance=self.options["spawn_min_distance"])
+
+        # Tiles reflecting the maze state, the mechanic hides them again where needed
+        self.maze_tiles = np.where(np.asarray(self.maze.grid) == 0, WALL, FLOOR).astype(np.uint8)
+        self.tiles = self.maze_tiles.copy()
+
+        self._maze_optimal_path = None
         if self.options["disable_target"]:
-            self.player, _ = self.spawn_players()
+            self.maze.player, _ = self.spawn_players()
+            self.player = self.maze.player
             self.target = (-1, -1)
         else:
-            # Set player positions
-            self.player, self.target = self.spawn_players()
+            # Cached and prefetched mazes come with spawn positions and the optimal path length
+            if self.maze.player is None:
+                self.maze.player, self.maze.target = self.spawn_players()
+            self.player, self.target = self.maze.player, self.maze.target
 
-            # Calculate shortest path
+            if self.maze.optimal_path_length is None:
+                self.maze.optimal_path_length = self.distance_to_goal()
 
-            self.maze_optimal_path = dfs(self, self.player, self.target)
-            self.maze_optimal_path_length = self.maze_optimal_path[0]
+                if self.corpus is not None and self.maze.key is not None:
+                    self.corpus.put(*self.maze.key, grid=self.maze.grid, player=self.player, target=self.target,
+                                    optimal_path_length=self.maze.optimal_path_length)
 
-        # Update player sprites
-        self.sprite_player.move(*self.player)
-        self.sprite_target.move(*self.target)
+            self.maze_optimal_path_length = self.maze.optimal_path_length
 
         # Update according to mechanic spec
         self.mechanic.on_start()
@@ -206,53 +399,24 @@ class MazeGame:
         # Reset Player step to 0
         self.player_steps = 0
 
-        # Render ??? TODO
-        self.rectangles = self.sprites.draw(self.surface)
-
         # Return state
-        return self.get_state(type=type)
+        return LazyState(self, type) if self.options["lazy_state"] else self.get_state(type=type)
 
     def spawn_players(self):
         """
         Spawns the players at two "random" locations
         :return:
         """
-        start_positions = []
-        for start_position in [(0, 0), (self.width - 1, self.height - 1)]:
-            queue = deque()
-            queue.append(start_position)
-            visited = []
-            while queue:
-                t = queue.popleft()
-
-                if self.maze.grid[t[0], t[1]] == 0:
-                    start_positions.append(t)
-                    queue.clear()
-                    continue
-                if t not in visited:
-                    visited.append(t)
-
-                x, y = t
-                if 0 <= x - 1:
-                    queue.append((x - 1, y))
-                if x < self.width - 1:
-                    queue.append((x + 1, y))
-                if 0 <= y - 1:
-                    queue.append((x, y - 1))
-                if y < self.height - 1:
-                    queue.append((x, y + 1))
-
-        return start_positions
+        return self.maze.spawn_players()
 
     def render(self, type=StateType.DEFAULT):
         """
         Render the game-state to the SCREEN (For visualizing, not required for drawing the state to the SURFACE)
         :return:
         """
-        #if type not in [StateType.ImageRGB, StateType.ImageGrayScale]:
-        self.rectangles = self.sprites.draw(self.surface)
-        self.screen.blit(self.surface, (0, 0))
-        pygame.display.update(self.rectangles)
+        if self.display is None:
+            self.display = PygameDisplay(self.screen_size)
+        self.display.show(self.renderer.render())
         return self.get_state(type=type)
 
     def on_return(self, reward, _type):
@@ -261,9 +425,11 @@ class MazeGame:
         :param reward:
         :return:
         """
-        return self.get_state(type=_type), reward, self.terminal, dict(
+        state = LazyState(self, _type) if self.options["lazy_state"] else self.get_state(type=_type)
+        return state, reward, self.terminal, dict(
             optimal_steps=self.maze_optimal_path_length,
-            step_count=self.player_steps
+            step_count=self.player_steps,
+            spawn=(self.maze.player, self.target)
         )
 
     def step(self, a, type=StateType.DEFAULT):
@@ -283,12 +449,8 @@ class MazeGame:
         if self.is_legal(next_x, next_y):
             self.player = (next_x, next_y)
             self.player_steps += 1
-            self.sprite_player.move(*self.player)
             self.mechanic.on_update()
 
-            if type in [StateType.ImageRGB, StateType.ImageGrayScale]:
-                self.rectangles = self.sprites.draw(self.surface)
-
         if self.player == self.target:
             self.terminal = True
             self.mechanic.on_terminal()
@@ -298,17 +460,20 @@ class MazeGame:
 
         return self.on_return(r, type)
 
-    @staticmethod
-    def quit():
+    def quit(self):
         """
-        Exit the pygame display engine
+        Close the pygame display, stop the prefetch workers and write the pending corpus records
         :return:
         """
-        try:
-            pygame.display.quit()
-            pygame.quit()
-        except:
-            pass
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+
+        if self.corpus is not None:
+            self.corpus.flush()
+
+        if self.display is not None:
+            self.display.close()
+            self.display = None
 
     @staticmethod
     def to_action(a):
@@ -339,39 +504,5 @@ class MazeGame:
         :param y: y coordinate of the position
         :return: List of legal positions
         """
-        legal = []
-
-        possible_moves = [
-            (x, y + 1),  # Down
-            (x, y - 1),  # Up
-            (x + 1, y),  # Left
-            (x - 1, y)  # Right
-        ]
-
-        for x, y in possible_moves:
-            if 0 <= x < self.width and 0 <= y < self.height and self.maze.grid[x, y] == 0:
-                legal.append((x, y))
-
-        return legal
-
-
-class Sprite(pygame.sprite.DirtySprite):
-    def __init__(self, color, x, y, w, h):
-        pygame.sprite.DirtySprite.__init__(self)
-        self.w = w
-        self.h = h
-        self.image = pygame.Surface((w, h))
-        self.image.fill(color)
-        self.rect = self.image.get_rect()
-        self.move(x, y)
-
-        self.original_color = color
-
-    def set_color(self, color):
-        self.image.fill(color)
-        self.dirty = 1
+        return self.maze.legal_directions(x, y)
 
-    def move(self, x, y):
-        self.rect.x = x * self.w
-        self.rect.y = y * self.h
-        self.dirty = 1
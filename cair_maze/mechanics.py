@@ -1,26 +1,72 @@
 import math
-import inspect
+import threading
 from abc import abstractmethod, ABC
+import numpy as np
+
+from .render import FOG
+from .visibility import line_of_sight_table, seen_from, has_bit
+
+# Registered mechanics by name, in registration order
+MECHANICS = {}
+
+# Set while create_mechanic() runs, mechanics refuse to be constructed outside of it
+_construction = threading.local()
+
+
+def register_mechanic(name=None, **default_args):
+    """
+    Class decorator that adds a mechanic to MECHANICS
+    :param name: registry name, defaults to the class name
+    :param default_args: mechanic_args used when the mechanic is enumerated, for example by gym_maze
+    :return: the decorator
+    """
+    def decorator(cls):
+        cls.default_args = default_args
+        MECHANICS[name or cls.__name__] = cls
+        return cls
+    return decorator
+
+
+def get_mechanic(name):
+    """
+    Look up a registered mechanic
+    :param name: registry name
+    :return: the mechanic class
+    """
+    if name not in MECHANICS:
+        raise ValueError("No mechanic called %s" % name)
+    return MECHANICS[name]
+
+
+def create_mechanic(mechanic, maze_game, mechanic_args):
+    """
+    Constructs a mechanic for a MazeGame. The check happens here rather than through a constructor argument, so
+    mechanics whose __init__ only takes the game keep working
+    :param mechanic: the mechanic class
+    :param maze_game: MazeGame instance
+    :param mechanic_args: dict of custom arguments
+    :return: the mechanic
+    """
+    _construction.depth = getattr(_construction, "depth", 0) + 1
+    try:
+        return mechanic(maze_game, **mechanic_args)
+    finally:
+        _construction.depth -= 1
 
 
 class BaseMazeMechanic(ABC):
 
+    # mechanic_args used when the mechanic is enumerated, set by register_mechanic()
+    default_args = {}
+
     def __init__(self, maze_game, **kwargs):
         """
         The BaseMazeMechanic. Cannot be initialized
         :param maze_game: MazeGame instance
         :param kwargs: dict of custom arguments
         """
-        # Retrieve the stack to backtrack the caller class
-        called_by_maze_game = False
-        for stack_item in inspect.stack():
-            if "self" in stack_item[0].f_locals.keys():
-                caller_class = stack_item[0].f_locals["self"].__class__
-                if "MazeGame" in str(caller_class):
-                    called_by_maze_game = True
-
         # Ensure that Mechanic is constructed from MazeGame
-        if not called_by_maze_game:
+        if not getattr(_construction, "depth", 0):
             raise ImportError("BaseMazeMechanic was not called from MazeGame. This is illegal behaviour!")
         self.game = maze_game
 
@@ -36,7 +82,28 @@ class BaseMazeMechanic(ABC):
     def on_terminal(self):
         raise NotImplementedError("on_terminal() must be properly overridden!")
 
+    def target_hidden(self):
+        """
+        Whether the target is currently drawn in the fog color
+        :return: Boolean
+        """
+        return False
+
 
+def _contains(cells, values):
+    """
+    Membership test against a sorted array, costs O(len(values) * log(len(cells)))
+    :param cells: sorted numpy array
+    :param values: numpy array
+    :return: boolean numpy array, True where a value is in cells
+    """
+    if len(cells) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(cells, values), len(cells) - 1)
+    return cells[positions] == values
+
+
+@register_mechanic()
 class NormalMaze(BaseMazeMechanic):
     def __init__(self, maze_game, **kwargs):
         """
@@ -56,6 +123,7 @@ class NormalMaze(BaseMazeMechanic):
         pass
 
 
+@register_mechanic(vision=3, show_target=False)
 class POMDPMaze(BaseMazeMechanic):
     def __init__(self, maze_game, **kwargs):
         """
@@ -67,56 +135,69 @@ class POMDPMaze(BaseMazeMechanic):
 
         self.vision = kwargs.get("vision")
         self.fog_color = kwargs.get("fog_color") if kwargs.get("fog_color") else (105, 105, 105)
-        self.fog_sprites_idx = []
+        self.game.palette[FOG] = self.fog_color
+        self.visible_cells = None
         self.show_target = kwargs.get("show_target") if kwargs.get("show_target") else False
 
+        # Whether the fog is applied, the timed mechanics only apply it after a delay
+        self.fog_active = False
+        self.target_visible = self.show_target
+
     def on_start(self):
         # 1. Start out with no vision at all
-        for sprite in self.game.sprite_maze:
-            sprite.set_color(self.fog_color)
+        self.game.tiles[...] = FOG
+        self.visible_cells = np.empty(0, dtype=np.int64)
 
         if not self.show_target:
-            self.game.sprite_target.set_color(self.fog_color)
+            self.target_visible = False
 
+        self.fog_active = True
         self.on_update()
 
+    def target_hidden(self):
+        return self.fog_active and not self.target_visible
+
     def on_terminal(self):
         pass
 
     def on_update(self):
-
-        self._reset_fow()
         self._update_fow()
         self._update_target_fow()
 
-    def _reset_fow(self):
-        # Reset previous fow sprites
-        for index in self.fog_sprites_idx:
-            sprite = self.game.sprites.get_sprite(index)
-            sprite.set_color(self.fog_color)
-        self.fog_sprites_idx.clear()
+    def _visible_cells(self):
+        """
+        Tiles seen from the player position, built from the vision window only
+        :return: sorted int64 numpy array of flat indices (x * height + y)
+        """
+        p_x, p_y = self.game.player
+        xs = np.arange(max(0, p_x - self.vision), min(self.game.width, p_x + self.vision), dtype=np.int64)
+        ys = np.arange(max(0, p_y - self.vision), min(self.game.height, p_y + self.vision), dtype=np.int64)
+        return (xs[:, None] * self.game.height + ys).ravel()
 
     def _update_fow(self):
-        p_x, p_y = self.game.player
-        # Reveal vision area
-        for x in range(max(0, p_x - self.vision), min(self.game.width, p_x + self.vision)):
-            for y in range(max(0, p_y - self.vision), min(self.game.height, p_y + self.vision)):
-                index = x + (y * self.game.height)
-                sprite = self.game.sprites.get_sprite(index)
-                sprite.set_color(sprite.original_color)
-                self.fog_sprites_idx.append(index)
+        """
+        Moves the fog to the new visibility. Only the tiles that changed visibility are written, so the cost follows
+        the vision and not the maze size
+        :return: sorted int64 numpy array of the flat indices of the newly revealed tiles
+        """
+        visible = self._visible_cells()
+        hidden = self.visible_cells[~_contains(visible, self.visible_cells)]
+        revealed = visible[~_contains(self.visible_cells, visible)]
+
+        np.put(self.game.tiles, hidden, FOG)
+        np.put(self.game.tiles, revealed, self.game.maze_tiles.take(revealed))
+        self.visible_cells = visible
+        return revealed
 
     def _update_target_fow(self):
         # If the target is hidden
         if not self.show_target:
             # Measure distance between player and target
             dist = math.hypot(self.game.target[0] - self.game.player[0], self.game.target[1] - self.game.player[1])
-            if dist < self.vision:
-                self.game.sprite_target.set_color(self.game.sprite_target.original_color)
-            else:
-                self.game.sprite_target.set_color(self.fog_color)
+            self.target_visible = dist < self.vision
 
 
+@register_mechanic(vision=3, show_target=False)
 class POMDPLimitedMaze(POMDPMaze):
     """
     The POMDPLimitedMaze. Further adds FOW to walls
@@ -125,77 +206,110 @@ class POMDPLimitedMaze(POMDPMaze):
     """
     def __init__(self, maze_game, **kwargs):
         super().__init__(maze_game, **kwargs)
-        self.target_index = None
+
+        # Line-of-sight table of the maze (see cair_maze.visibility) and the tiles the target is seen from
+        self.line_of_sight = None
+        self.target_seen_from = None
 
     def on_start(self):
+        self.line_of_sight = line_of_sight_table(self.game.maze, self.vision)
+        target = self.game.target[0] * self.game.height + self.game.target[1]
+        self.target_seen_from = seen_from(self.line_of_sight, target)
         super().on_start()
 
-        # Determine index of the goal
-        self.target_index = self.game.target[0] + (self.game.target[1] * self.game.height)
-
     def on_terminal(self):
         super().on_terminal()
 
     def on_update(self):
-        self._reset_fow()
         self._update_fow()
         self._update_target_fow()
 
-    def _update_fow(self):
-        p_x, p_y = self.game.player
-
-        for direction in [
-            [(x, p_y, True) for x in range(p_x, min(self.game.width, p_x + self.vision))],
-            [(x, p_y, True) for x in reversed(range(max(0, p_x - self.vision), p_x))],
-            [(p_x, y, False) for y in range(p_y, min(self.game.height, p_y + self.vision))],
-            [(p_x, y, False) for y in reversed(range(max(0, p_y - self.vision), p_y))]]:
-
-            for x, y, is_horizontal in direction:
-                index = x + (y * self.game.height)
-                self.fog_sprites_idx.append(index)
-
-                if self.game.maze.grid[x, y] == 1:
-                    break
-
-                # Check neighbours, the player should see the walls
-                index_0 = None
-                index_1 = None
-                if is_horizontal:
-                    # We are looking for horizontal neighbours
-                    x_0, y_0 = x, max(0, y - 1)
-                    x_1, y_1 = x, min(self.game.height - 1, y + 1)
-
-                    if self.game.maze.grid[x_0, y_0] == 1:
-                        index_0 = x_0 + (y_0 * self.game.height)
-                    if self.game.maze.grid[x_1, y_1] == 1:
-                        index_1 = x_1 + (y_1 * self.game.height)
-                else:
-                    # We are looking for vertical neighbours
-                    x_0, y_0 = max(0, x - 1), y
-                    x_1, y_1 = min(self.game.width - 1, x + 1), y
-
-                    if self.game.maze.grid[x_0, y_0] == 1:
-                        index_0 = x_0 + (y_0 * self.game.height)
-                    if self.game.maze.grid[x_1, y_1] == 1:
-                        index_1 = x_1 + (y_1 * self.game.height)
-
-                if index_0:
-                    self.fog_sprites_idx.append(index_0)
-                if index_1:
-                    self.fog_sprites_idx.append(index_1)
-
-        for fog_sprite_idx in self.fog_sprites_idx:
-            fog_sprite = self.game.sprites.get_sprite(fog_sprite_idx)
-            fog_sprite.set_color(fog_sprite.original_color)
+    def _visible_cells(self):
+        indptr, indices = self.line_of_sight
+        cell = self.game.player[0] * self.game.height + self.game.player[1]
+        return indices[indptr[cell]:indptr[cell + 1]].astype(np.int64)
 
     def _update_target_fow(self):
         if not self.show_target:
-            if self.target_index in self.fog_sprites_idx:
-                self.game.sprite_target.set_color(self.game.sprite_target.original_color)
-            else:
-                self.game.sprite_target.set_color(self.fog_color)
+            player = self.game.player[0] * self.game.height + self.game.player[1]
+            self.target_visible = has_bit(self.target_seen_from, player)
+
+
+@register_mechanic(vision=3, show_target=False)
+class POMDPExploredMaze(POMDPMaze):
+    """
+    The POMDPExploredMaze. Adds FOW and remembers every tile seen during the episode
+    :param maze_game: MazeGame instance
+    :param kwargs: dict of custom arguments
+    """
+
+    # memory_map() value of tiles that have not been seen yet
+    UNEXPLORED = 4
+
+    def __init__(self, maze_game, **kwargs):
+        super().__init__(maze_game, **kwargs)
+
+        # Packed bitset of the seen tiles, bit c is flat index c = x * height + y
+        self.explored = None
+        self.explored_count = 0
+        self.target_seen = False
+
+    def on_start(self):
+        self.explored = np.zeros((self.game.width * self.game.height + 7) // 8, dtype=np.uint8)
+        self.explored_count = 0
+        self.target_seen = False
+        super().on_start()
+
+    def on_update(self):
+        revealed = self._update_fow()
+        self._update_explored(revealed)
+        self._update_target_fow()
+        self.target_seen = self.target_seen or self.target_visible
+
+    def _update_explored(self, cells):
+        """
+        Sets the bits of the revealed tiles. Tiles that stayed visible are already explored, so only the tiles
+        revealed by this step are tested
+        :param cells: int64 numpy array of the flat indices of the newly revealed tiles
+        """
+        cells = cells[((self.explored[cells >> 3] >> (7 - (cells & 7))) & 1) == 0]
+        if len(cells) == 0:
+            return
+        np.bitwise_or.at(self.explored, cells >> 3, (0x80 >> (cells & 7)).astype(np.uint8))
+        self.explored_count += len(cells)
+
+    def explored_mask(self):
+        """
+        Tiles seen so far this episode
+        :return: boolean numpy array of shape (width, height)
+        """
+        size = self.game.width * self.game.height
+        return np.unpackbits(self.explored, count=size).view(bool).reshape(self.game.width, self.game.height)
+
+    def memory_map(self):
+        """
+        Remembered map of the episode, in the format of StateType.Array: 0 open, 1 wall, 2 player, 3 target once it
+        has been seen and UNEXPLORED for tiles that were never seen
+        :return: uint8 numpy array of shape (width, height)
+        """
+        state = np.where(self.explored_mask(), np.asarray(self.game.maze.grid), self.UNEXPLORED).astype(np.uint8)
+        state[self.game.player[0], self.game.player[1]] = 2
+        if self.target_seen:
+            state[self.game.target[0], self.game.target[1]] = 3
+        return state
+
+
+@register_mechanic(vision=3, show_target=False)
+class POMDPLimitedExploredMaze(POMDPExploredMaze, POMDPLimitedMaze):
+    """
+    The POMDPLimitedExploredMaze. Line-of-sight FOW of POMDPLimitedMaze with the memory of POMDPExploredMaze
+    :param maze_game: MazeGame instance
+    :param kwargs: dict of custom arguments
+    """
+    pass
 
 
+@register_mechanic(vision=3, show_target=False, delay=5)
 class TimedPOMDPLimitedMaze(POMDPLimitedMaze):
     def __init__(self, maze_game, **kwargs):
         super().__init__(maze_game, **kwargs)
@@ -205,6 +319,7 @@ class TimedPOMDPLimitedMaze(POMDPLimitedMaze):
     def on_start(self):
 
         self.ticks = 0
+        self.fog_active = False
 
     def on_terminal(self):
         super().on_terminal()
@@ -218,6 +333,7 @@ class TimedPOMDPLimitedMaze(POMDPLimitedMaze):
             super().on_update()
 
 
+@register_mechanic(vision=3, show_target=False, delay=5)
 class TimedPOMDPMaze(POMDPMaze):
     """
     The TimedPOMDPMaze. Adds FOW after a delay (ticks)
@@ -232,6 +348,7 @@ class TimedPOMDPMaze(POMDPMaze):
     def on_start(self):
 
         self.ticks = 0
+        self.fog_active = False
 
     def on_terminal(self):
         super().on_terminal()
@@ -0,0 +1,68 @@
+import random
+import struct
+import numpy as np
+
+from .algorithms import eller_rows
+
+# File layout: magic, width, height, then one np.packbits() row of ceil(width / 8) bytes per y coordinate
+MAGIC = b"CMZ1"
+HEADER = struct.Struct("<4sQQ")
+
+
+def generate_packed(path, width, height, seed=None):
+    """
+    Streams an Eller maze straight to a bit-packed file. Only one row is held in memory at a time, so peak memory
+    stays constant no matter how tall the maze is.
+    :param path: destination file
+    :param width: width of the maze in tiles
+    :param height: height of the maze in tiles
+    :param seed: seed of the generator, None for a random seed
+    :return: None
+    """
+    rng = random.Random(seed)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height))
+        for _, row in eller_rows(width, height, rng=rng):
+            f.write(np.packbits(np.frombuffer(row, dtype=np.uint8)).tobytes())
+
+
+class PackedGrid:
+    """
+    Read-only, memory-mapped view of a bit-packed maze file. Indexes like the (width, height) grid of a Maze
+    but only the rows that are touched are read from disk.
+    """
+    dtype = np.uint8
+
+    def __init__(self, path):
+        """
+        Opens a file written by generate_packed()
+        :param path: path of the packed maze file
+        """
+        with open(path, "rb") as f:
+            magic, width, height = HEADER.unpack(f.read(HEADER.size))
+
+        if magic != MAGIC:
+            raise ValueError("%s is not a packed maze file" % path)
+
+        self.path = path
+        self.shape = (width, height)
+        self.bits = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size, shape=(height, (width + 7) // 8))
+
+    def __getitem__(self, key):
+        x, y = key
+        width, height = self.shape
+
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            if not (-width <= x < width and -height <= y < height):
+                raise IndexError("index %s is out of bounds for shape %s" % ((x, y), self.shape))
+            x, y = x % width, y % height
+            return (self.bits[y, x >> 3] >> (7 - (x & 7))) & 1
+
+        # Unpack only the requested rows, then transpose back to (x, y) order
+        rows = np.unpackbits(self.bits[y], axis=-1, count=width)
+        return rows[..., x].T
+
+    def __array__(self, dtype=None, copy=None):
+        grid = np.unpackbits(self.bits, axis=1, count=self.shape[0]).T
+        return grid if dtype is None else grid.astype(dtype)
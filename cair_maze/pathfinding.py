@@ -1,4 +1,5 @@
 from queue import PriorityQueue
+import numpy as np
 
 
 def dfs(maze_game, start, goal):
@@ -27,3 +28,219 @@ def dfs(maze_game, start, goal):
 
     return possible_path.get()
 
+
+def adjacency(grid):
+    """
+    Flat-index adjacency of the open tiles of a grid. Tile (x, y) has flat index x * height + y and its neighbours
+    are listed in action order (0: y + 1, 1: y - 1, 2: x - 1, 3: x + 1), -1 where the move is illegal
+    :param grid: numpy array of shape (width, height) (1 = wall, 0 = open)
+    :return: int32 numpy array of shape (width * height, 4)
+    """
+    grid = np.asarray(grid)
+    width, height = grid.shape
+    is_open = grid == 0
+    index = np.arange(width * height, dtype=np.int32).reshape(width, height)
+
+    neighbours = np.full((width, height, 4), -1, dtype=np.int32)
+    both = is_open[:, :-1] & is_open[:, 1:]
+    neighbours[:, :-1, 0] = np.where(both, index[:, 1:], -1)
+    neighbours[:, 1:, 1] = np.where(both, index[:, :-1], -1)
+    both = is_open[:-1, :] & is_open[1:, :]
+    neighbours[1:, :, 2] = np.where(both, index[:-1, :], -1)
+    neighbours[:-1, :, 3] = np.where(both, index[1:, :], -1)
+
+    return neighbours.reshape(width * height, 4)
+
+
+def shortest_path(grid, start, goal, neighbours=None):
+    """
+    breadth-first-search over the flat-index adjacency, O(tiles)
+    :param grid: numpy array of shape (width, height) (1 = wall, 0 = open)
+    :param start: tuple (x,y) of start position
+    :param goal: tuple (x,y) of the goal position
+    :param neighbours: precomputed adjacency(grid), computed when omitted
+    :return: tuple of (length, path) where path lists the positions from start to goal, None if goal is unreachable
+    """
+    width, height = np.shape(grid)
+    if neighbours is None:
+        neighbours = adjacency(grid)
+
+    source = start[0] * height + start[1]
+    target = goal[0] * height + goal[1]
+
+    flat = neighbours.ravel().tolist()
+    parents = [-1] * (width * height)
+    parents[source] = source
+    queue = [source]
+
+    for cell in queue:
+        if cell == target:
+            break
+        for nxt in flat[4 * cell:4 * cell + 4]:
+            if nxt >= 0 and parents[nxt] < 0:
+                parents[nxt] = cell
+                queue.append(nxt)
+    else:
+        return None
+
+    path = [target]
+    while path[-1] != source:
+        path.append(parents[path[-1]])
+    path.reverse()
+
+    return len(path) - 1, [divmod(cell, height) for cell in path]
+
+
+def bfs(maze_game, start, goal):
+    """
+    breadth-first-search, a drop-in replacement for dfs() that returns the same (length, path) tuple
+    :param maze_game: the GameMaze instance
+    :param start: tuple (x,y) of start position
+    :param goal: tuple (x,y) of the goal position
+    :return: tuple of (length, path), None if goal is unreachable
+    """
+    maze = maze_game.maze
+    return shortest_path(maze.grid, start, goal, neighbours=maze.adjacency)
+
+
+# Sentinel of action_field() for tiles without an optimal action (the goal, walls and unreachable tiles)
+NO_ACTION = 255
+
+# (dx, dy) of each action, matching MazeGame.to_action()
+ACTION_DELTAS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+def distance_field(grid, goal, neighbours=None):
+    """
+    Reverse breadth-first-search from the goal, giving the shortest distance to the goal from every tile
+    :param grid: numpy array of shape (width, height) (1 = wall, 0 = open)
+    :param goal: tuple (x,y) of the goal position
+    :param neighbours: precomputed adjacency(grid), computed when omitted
+    :return: int32 numpy array of shape (width, height), -1 for walls and unreachable tiles
+    """
+    width, height = np.shape(grid)
+    if neighbours is None:
+        neighbours = adjacency(grid)
+
+    flat = neighbours.ravel().tolist()
+    distances = [-1] * (width * height)
+    source = goal[0] * height + goal[1]
+    distances[source] = 0
+    queue = [source]
+
+    for cell in queue:
+        d = distances[cell] + 1
+        for nxt in flat[4 * cell:4 * cell + 4]:
+            if nxt >= 0 and distances[nxt] < 0:
+                distances[nxt] = d
+                queue.append(nxt)
+
+    return np.array(distances, dtype=np.int32).reshape(width, height)
+
+
+def _shifted(shape, dx, dy):
+    """
+    Slices selecting every tile that has a neighbour at (dx, dy), and the matching slices of those neighbours
+    :return: tuple of (tiles, neighbours) index tuples
+    """
+    width, height = shape
+    tiles = (slice(max(0, -dx), width - max(0, dx)), slice(max(0, -dy), height - max(0, dy)))
+    neighbours = (slice(max(0, dx), width - max(0, -dx)), slice(max(0, dy), height - max(0, -dy)))
+    return tiles, neighbours
+
+
+def action_field(distances):
+    """
+    Optimal action of every tile, the first action (in action order) that steps one tile closer to the goal
+    :param distances: distance_field() of the goal
+    :return: uint8 numpy array of shape (width, height), NO_ACTION where there is no optimal action
+    """
+    actions = np.full(distances.shape, NO_ACTION, dtype=np.uint8)
+    closer = distances - 1
+
+    # Written in reverse so the lowest action wins ties
+    for action in reversed(range(4)):
+        tiles, neighbours = _shifted(distances.shape, *ACTION_DELTAS[action])
+        better = (distances[neighbours] == closer[tiles]) & (distances[tiles] > 0)
+        actions[tiles][better] = action
+
+    return actions
+
+
+def follow_actions(distances, actions, start):
+    """
+    Walks the action_field() from start to the goal
+    :param distances: distance_field() of the goal
+    :param actions: action_field() of the goal
+    :param start: tuple (x,y) of start position
+    :return: tuple of (length, path), the same format as shortest_path(), None if the goal is unreachable
+    """
+    if distances[start[0], start[1]] < 0:
+        return None
+
+    x, y = start
+    path = [(x, y)]
+    action = actions[x, y]
+    while action != NO_ACTION:
+        dx, dy = ACTION_DELTAS[action]
+        x, y = x + dx, y + dy
+        path.append((x, y))
+        action = actions[x, y]
+
+    return len(path) - 1, path
+
+
+def batch_distances(grids, starts, goals, return_fields=False):
+    """
+    Breadth-first-search over a stack of mazes at once. Every maze advances its frontier by one step per iteration
+    with boolean shifts, so the python overhead is paid once per search depth rather than once per tile
+    :param grids: numpy array of shape (n, width, height) (1 = wall, 0 = open)
+    :param starts: integer array of shape (n, 2) of start positions
+    :param goals: integer array of shape (n, 2) of goal positions
+    :param return_fields: also return the full distance field of every maze
+    :return: int32 array of shape (n, ) with the start to goal distances (-1 if unreachable).
+    With return_fields, a tuple of (distances, fields) where fields has shape (n, width, height)
+    """
+    grids = np.asarray(grids)
+    starts = np.asarray(starts)
+    goals = np.asarray(goals)
+    n = grids.shape[0]
+    rows = np.arange(n)
+
+    is_open = grids == 0
+    frontier = np.zeros(grids.shape, dtype=bool)
+    frontier[rows, goals[:, 0], goals[:, 1]] = True
+    frontier &= is_open
+    visited = frontier.copy()
+
+    distances = np.full(n, -1, dtype=np.int32)
+    fields = np.full(grids.shape, -1, dtype=np.int32) if return_fields else None
+    expanded = np.empty_like(frontier)
+
+    level = 0
+    while True:
+        if return_fields:
+            fields[frontier] = level
+
+        reached = frontier[rows, starts[:, 0], starts[:, 1]]
+        distances[reached] = level
+
+        if not return_fields:
+            # Mazes that reached their start stop expanding
+            frontier[reached] = False
+
+        if not frontier.any():
+            break
+
+        expanded.fill(False)
+        expanded[:, :, 1:] |= frontier[:, :, :-1]
+        expanded[:, :, :-1] |= frontier[:, :, 1:]
+        expanded[:, 1:, :] |= frontier[:, :-1, :]
+        expanded[:, :-1, :] |= frontier[:, 1:, :]
+        expanded &= is_open
+        expanded &= ~visited
+        visited |= expanded
+        frontier, expanded = expanded, frontier
+        level += 1
+
+    return (distances, fields) if return_fields else distances
@@ -0,0 +1,94 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .maze import Maze
+
+
+def prefetch_maze(width, height, algorithm, solve=True, spawn="corners", spawn_min_distance=0):
+    """
+    Generates a maze and solves its spawn positions and optimal path. Runs inside a prefetch worker
+    :param width: width of the maze in tiles
+    :param height: height of the maze in tiles
+    :param algorithm: the generator algorithm
+    :param solve: solve the optimal path between the spawn positions
+    :param spawn: spawn policy, see Maze
+    :param spawn_min_distance: minimum path length between player and target for the distance spawn policy
+    :return: Maze with player, target, optimal_path_length and the distance and action fields filled in
+    """
+    maze = Maze(width=width, height=height, maze_algorithm=algorithm, spawn=spawn,
+                spawn_min_distance=spawn_min_distance)
+    maze.player, maze.target = maze.spawn_players()
+
+    if solve:
+        maze.solve(maze.target)
+        maze.optimal_path_length = int(maze.distance_field[maze.player])
+
+    return maze
+
+
+class MazePrefetcher:
+    """
+    Keeps a bounded queue of mazes that are generated and solved ahead of time by a process pool.
+    get() never blocks: it returns a finished maze when there is one and lets the caller fall back to
+    generating inline otherwise.
+    """
+
+    def __init__(self, width, height, algorithm="randomized_prim", depth=8, workers=None, solve=True,
+                 spawn="corners", spawn_min_distance=0):
+        """
+        :param width: width of the mazes in tiles
+        :param height: height of the mazes in tiles
+        :param algorithm: the generator algorithm
+        :param depth: number of mazes kept in flight
+        :param workers: number of worker processes, defaults to the number of cores
+        :param solve: solve the optimal path in the workers
+        :param spawn: spawn policy, see Maze
+        :param spawn_min_distance: minimum path length between player and target for the distance spawn policy
+        """
+        self.args = (width, height, algorithm, solve, spawn, spawn_min_distance)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.queue = deque()
+        self.hits = 0
+        self.misses = 0
+
+        for _ in range(depth):
+            self.queue.append(self.executor.submit(prefetch_maze, *self.args))
+
+    @property
+    def depth(self):
+        """
+        Number of finished mazes waiting in the queue
+        """
+        return sum(1 for future in self.queue if future.done())
+
+    @property
+    def miss_rate(self):
+        """
+        Fraction of requests that found no finished maze
+        """
+        requests = self.hits + self.misses
+        return self.misses / requests if requests else 0.0
+
+    def ready(self):
+        return any(future.done() for future in self.queue)
+
+    def get(self):
+        """
+        Pop a finished maze and schedule a replacement
+        :return: Maze, or None when no maze is ready
+        """
+        for future in self.queue:
+            if future.done():
+                self.queue.remove(future)
+                self.queue.append(self.executor.submit(prefetch_maze, *self.args))
+                self.hits += 1
+                return future.result()
+
+        self.misses += 1
+        return None
+
+    def close(self):
+        for future in self.queue:
+            future.cancel()
+        self.queue.clear()
+        self.executor.shutdown(wait=False)
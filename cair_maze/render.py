@@ -0,0 +1,145 @@
+import numpy as np
+
+# Luminance weights of skimage.color.rgb2gray
+GRAYSCALE_WEIGHTS = np.array([0.2125, 0.7154, 0.0721])
+
+# Palette indices of MazeGame.tiles. Following MazeGame.colors, "floor" is drawn on walls and "wall" on open tiles
+FLOOR, WALL, GOAL, PLAYER, FOG = range(5)
+PALETTE_COLORS = ("floor", "wall", "goal", "player")
+
+
+def area_weights(tiles, tile_size, screen_size, output_size):
+    """
+    Integer overlap between every output pixel and every tile, measured on the screen scaled by output_size so
+    all boundaries fall on integers. Each row sums to screen_size
+    :param tiles: number of tiles along the axis
+    :param tile_size: size of a tile on the screen
+    :param screen_size: size of the screen along the axis
+    :param output_size: number of output pixels along the axis
+    :return: int64 numpy array of shape (output_size, tiles)
+    """
+    starts = np.minimum(np.arange(tiles) * tile_size, screen_size) * output_size
+    ends = np.minimum((np.arange(tiles) + 1) * tile_size, screen_size) * output_size
+    pixel_starts = np.arange(output_size)[:, None] * screen_size
+    pixel_ends = pixel_starts + screen_size
+    return np.clip(np.minimum(ends, pixel_ends) - np.maximum(starts, pixel_starts), 0, None).astype(np.int64)
+
+
+def rasterize(indices, palette, weights_x, weights_y, grayscale=False):
+    """
+    Area-weighted rasterization of palette-index tiles, see NumpyRenderer.render_resized()
+    :param indices: uint8 numpy array of shape (..., width, height), leading dimensions are batch dimensions
+    :param palette: uint8 numpy array of shape (colors, 3)
+    :param weights_x: area_weights() of the x axis
+    :param weights_y: area_weights() of the y axis
+    :param grayscale: return luminance instead of RGB
+    :return: uint8 numpy array of shape (..., output width, output height, 3), without the channel for grayscale
+    """
+    area = int(weights_x[0].sum() * weights_y[0].sum())
+    if grayscale:
+        # Luminance is linear, so converting the palette first gives the same result as converting pixels
+        gray = (palette @ GRAYSCALE_WEIGHTS)[indices]
+        state = weights_x @ gray @ weights_y.T
+        return np.rint(state / area).astype(np.uint8)
+
+    colors = palette.astype(np.int64)[indices]
+    state = np.einsum("ix,...xyc,jy->...ijc", weights_x, colors, weights_y, optimize=True)
+    return ((state + area // 2) // area).astype(np.uint8)
+
+
+class NumpyRenderer:
+    """
+    Headless renderer that builds the frame from the palette-index tiles of the game, with the player and the target
+    drawn on top. Does not touch pygame, which is only used to display the frames.
+    """
+
+    def __init__(self, game, screen_size):
+        """
+        :param game: MazeGame instance
+        :param screen_size: tuple of w and h value (640, 480)
+        """
+        self.game = game
+        self.screen_width, self.screen_height = screen_size
+
+        # Persistent frame and the palette and tile indices it currently shows
+        self.frame = None
+        self.drawn = None
+        self.drawn_palette = None
+
+        # Area weights from tiles to output pixels, per output size
+        self._weights = {}
+
+    def tile_indices(self):
+        """
+        Palette index of every tile, with the target and the player drawn on top
+        :return: uint8 numpy array of shape (width, height)
+        """
+        game = self.game
+        indices = game.tiles.copy()
+
+        # The player is drawn above the target, and both cover exactly one tile
+        self._overlay(indices, game.target, FOG if game.mechanic.target_hidden() else GOAL)
+        self._overlay(indices, game.player, PLAYER)
+        return indices
+
+    def _overlay(self, indices, position, index):
+        x, y = position
+        if x >= 0 and y >= 0:
+            indices[x, y] = index
+
+    def render_resized(self, size, grayscale=False, indices=None):
+        """
+        Rasterizes the tiles straight at the output resolution. Every output pixel is the area-weighted average of
+        the tiles it covers, which replaces rendering at screen size followed by a resize and a color conversion
+        :param size: tuple of the output width and height
+        :param grayscale: return luminance instead of RGB
+        :param indices: tile_indices() to draw, defaults to the current game state
+        :return: uint8 numpy array of shape (width, height, 3) or (width, height) for grayscale, in the layout of
+        pygame.surfarray (not flipped)
+        """
+        game = self.game
+        size = tuple(size)
+        if size not in self._weights:
+            self._weights[size] = (
+                area_weights(game.width, game.tile_width, self.screen_width, size[0]),
+                area_weights(game.height, game.tile_height, self.screen_height, size[1])
+            )
+        weights_x, weights_y = self._weights[size]
+
+        if indices is None:
+            indices = self.tile_indices()
+        return rasterize(indices, game.palette, weights_x, weights_y, grayscale)
+
+    def render(self, indices=None):
+        """
+        Draws the current game state into the persistent frame buffer. Only the tiles whose color changed since the
+        previous call are rewritten, which is usually the old and new player tile plus the fog border
+        :param indices: tile_indices() to draw, defaults to the current game state
+        :return: uint8 numpy array of shape (screen width, screen height, 3), the layout of pygame.surfarray.
+        The array is the frame buffer itself and is overwritten by the next call
+        """
+        game = self.game
+        if indices is None:
+            indices = self.tile_indices()
+
+        if self.frame is None or self.drawn.shape != indices.shape or \
+                not np.array_equal(self.drawn_palette, game.palette):
+            dirty = None
+        else:
+            dirty = np.argwhere(indices != self.drawn)
+
+        if dirty is None or len(dirty) > indices.size // 4:
+            frame = np.repeat(game.palette[indices], game.tile_width, axis=0)[:self.screen_width]
+            frame = np.repeat(frame, game.tile_height, axis=1)[:, :self.screen_height]
+            if self.frame is None:
+                self.frame = frame.copy()
+            else:
+                self.frame[...] = frame
+        else:
+            tw, th = game.tile_width, game.tile_height
+            for x, y in dirty.tolist():
+                self.frame[x * tw:(x + 1) * tw, y * th:(y + 1) * th] = game.palette[indices[x, y]]
+
+        self.drawn = indices
+        self.drawn_palette = game.palette.copy()
+        return self.frame
@@ -0,0 +1,236 @@
+import os
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+from .corpus import MazeCorpus
+from .maze_game import MazeGame, StateType
+from .mechanics import NormalMaze
+
+
+def _layout(n, state_shape, state_dtype):
+    """
+    Offsets of the batched arrays inside the shared memory block, every array starts on a 64 byte boundary
+    :return: tuple of (list of (name, shape, dtype, offset), total size in bytes)
+    """
+    arrays = [
+        ("actions", (n, ), np.dtype(np.int64)),
+        ("states", (n, ) + tuple(state_shape), np.dtype(state_dtype)),
+        ("rewards", (n, ), np.dtype(np.float64)),
+        ("terminals", (n, ), np.dtype(bool)),
+        ("optimal_steps", (n, ), np.dtype(np.int64)),
+        ("step_count", (n, ), np.dtype(np.int64))
+    ]
+
+    layout, offset = [], 0
+    for name, shape, dtype in arrays:
+        layout.append((name, shape, dtype, offset))
+        offset += -(-int(np.prod(shape)) * dtype.itemsize // 64) * 64
+    return layout, max(offset, 1)
+
+
+def _views(buffer, layout):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset) for name, shape, dtype, offset in layout
+    }
+
+
+def _worker(pipe, shm_name, layout, games, game_args, type, auto_reset):
+    """
+    Worker loop. Steps a slice of the games and writes their results into the shared arrays, the pipe only carries
+    the commands and an acknowledgement
+    :param games: range of the game indices owned by the worker
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = _views(shm.buf, layout)
+    try:
+        instances = [MazeGame(**args) for args in game_args]
+
+        def write(i, game, optimal_steps, step_count):
+            game.get_state(type=type, out=arrays["states"][i])
+            arrays["optimal_steps"][i] = -1 if optimal_steps is None else optimal_steps
+            arrays["step_count"][i] = step_count
+
+        while True:
+            command = pipe.recv()
+            if command == "step":
+                for i, game in zip(games, instances):
+                    _, reward, terminal, info = game.step(int(arrays["actions"][i]), type=type)
+                    arrays["rewards"][i] = reward
+                    arrays["terminals"][i] = terminal
+                    if terminal and auto_reset:
+                        game.reset(type=type)
+                    write(i, game, info["optimal_steps"], info["step_count"])
+            elif command == "reset":
+                for i, game in zip(games, instances):
+                    game.reset(type=type)
+                    write(i, game, game.maze_optimal_path_length, game.player_steps)
+            elif command == "close":
+                for game in instances:
+                    game.quit()
+                pipe.send(("ok", None))
+                break
+            pipe.send(("ok", None))
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+    finally:
+        del arrays
+        shm.close()
+
+
+class SubprocessMazeGame:
+    """
+    N maze games of any mechanic spread over worker processes. States, rewards, terminals and info are written by
+    the workers straight into batched numpy arrays in a shared memory block, so the pipes only carry a command per
+    step. step_async() and step_wait() let the caller overlap its own work with the stepping.
+    """
+
+    def __init__(self, n, maze_size, screen_size=(640, 480), mechanic=NormalMaze, mechanic_args=None, colors=None,
+                 options=None, type=StateType.Array, workers=None, auto_reset=True, context=None):
+        """
+        :param n: number of games
+        :param maze_size: tuple of w and h value (10, 10)
+        :param screen_size: tuple of w and h value (640, 480)
+        :param mechanic: mechanic class or registered name, see MazeGame
+        :param mechanic_args: A dict of properties sent to the mechanic class
+        :param colors: see MazeGame
+        :param options: options of every MazeGame, without prefetching. With a seed, game i uses seed + i.
+        A corpus is shared through its directory, every game reads the records of the others
+        observation_view=True returns the shared arrays themselves instead of copies
+        :param type: the StateType of the states
+        :param workers: number of worker processes, defaults to the number of cores (at most n)
+        :param auto_reset: games that reach their target are reset within step()
+        :param context: multiprocessing start method, None for the platform default
+        """
+        options = dict(options) if options else {}
+        self.n = n
+        self.type = type
+        self.copy = not options.get("observation_view", False)
+        self.waiting = False
+
+        # Workers build every state lazily into the shared arrays. They run as daemons, which cannot start the
+        # prefetch process pool, and already generate mazes in parallel
+        options["lazy_state"] = True
+        options["prefetch"] = 0
+
+        # Every worker game opens its own MazeCorpus on the directory, which is safe as each writes its own segments
+        if isinstance(options.get("corpus"), MazeCorpus):
+            options["corpus"].flush()
+            options["corpus"] = options["corpus"].directory
+        game_args = []
+        for i in range(n):
+            game_options = dict(options)
+            if options.get("seed") is not None:
+                game_options["seed"] = options["seed"] + i
+            game_args.append(dict(maze_size=maze_size, screen_size=screen_size, mechanic=mechanic,
+                                  mechanic_args=mechanic_args, colors=colors, options=game_options))
+
+        # Shape and dtype of a state, from a game built in this process
+        probe = MazeGame(**game_args[0])
+        state = probe.get_state(type=type)
+        probe.quit()
+        layout, size = _layout(n, state.shape, state.dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = _views(self.shm.buf, layout)
+
+        workers = min(n, workers or os.cpu_count() or 1)
+        context = multiprocessing.get_context(context)
+        self.pipes = []
+        self.processes = []
+        for games in np.array_split(np.arange(n), workers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_worker, daemon=True,
+                args=(child, self.shm.name, layout, games.tolist(), game_args[games[0]:games[-1] + 1], type,
+                      auto_reset)
+            )
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def _send(self, command):
+        for pipe in self.pipes:
+            pipe.send(command)
+
+    def _wait(self):
+        errors = [message for status, message in (pipe.recv() for pipe in self.pipes) if status == "error"]
+        if errors:
+            raise RuntimeError("MazeGame worker failed:\n%s" % errors[0])
+
+    def _states(self):
+        return self.arrays["states"].copy() if self.copy else self.arrays["states"]
+
+    def reset(self):
+        """
+        Resets every game
+        :return: The batched state
+        """
+        self._send("reset")
+        self._wait()
+        return self._states()
+
+    def step_async(self, actions):
+        """
+        Starts stepping every game, the results are collected by step_wait()
+        :param actions: integer array of shape (n, ) with actions from 0 - 3
+        :return: None
+        """
+        if self.waiting:
+            raise RuntimeError("step_async() called twice without step_wait()")
+        self.arrays["actions"][:] = actions
+        self._send("step")
+        self.waiting = True
+
+    def step_wait(self):
+        """
+        Waits for the step started by step_async(). With auto_reset, the returned state of a finished game is the
+        first state of its next episode
+        :return: s, r, t, info where r and t are arrays of shape (n, ) and info holds arrays of optimal_steps (-1
+        without a target) and step_count
+        """
+        self.waiting = False
+        self._wait()
+        arrays = self.arrays
+        return self._states(), arrays["rewards"].copy(), arrays["terminals"].copy(), dict(
+            optimal_steps=arrays["optimal_steps"].copy(),
+            step_count=arrays["step_count"].copy()
+        )
+
+    def step(self, actions):
+        """
+        Steps every game
+        :param actions: integer array of shape (n, ) with actions from 0 - 3
+        :return: s, r, t, info, see step_wait()
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory
+        :return: None
+        """
+        if self.shm is None:
+            return
+
+        # Workers that failed have already exited, so every pipe is handled on its own
+        for pipe in self.pipes:
+            try:
+                if self.waiting:
+                    pipe.recv()
+                pipe.send("close")
+                pipe.recv()
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+        self.waiting = False
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self.arrays = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,215 @@
+from math import ceil
+import numpy as np
+
+from .algorithms import generate_batch
+from .maze import Maze
+from .maze_game import StateType
+from .pathfinding import ACTION_DELTAS, batch_distances
+from .render import area_weights, rasterize, PALETTE_COLORS, FLOOR, WALL, GOAL, PLAYER
+
+
+class VectorMazeGame:
+    """
+    N maze games stepped together with vectorized numpy operations. The mazes are drawn from a pool that is generated
+    and solved in one batch, every game holds an index into the pool together with its player and target position.
+    Only the mechanics of NormalMaze are supported, cair_maze.subproc.SubprocessMazeGame runs the others. The pool is
+    generated in memory and is not read from or written to a MazeCorpus.
+    """
+
+    def __init__(self, n, maze_size, screen_size=(640, 480), colors=None, options=None):
+        """
+        :param n: number of games
+        :param maze_size: tuple of w and h value (10, 10)
+        :param screen_size: tuple of w and h value (640, 480)
+        :param colors: dict(
+            goal=(255, 0, 0),
+            player=(0, 255, 0),
+            wall=(255, 255, 255),
+            floor=(0, 0, 0)
+        )
+        :param options: dict(
+            algorithm="randomized_prim",  # maze generator, see cair_maze.algorithms.BATCH_ALGORITHMS and ALGORITHMS
+            seed=None,  # seed of the maze pool and of the maze assignment on reset
+            pool_size=None,  # number of mazes in the pool, defaults to n
+            spawn="corners",  # spawn policy: corners, random or distance, see Maze
+            spawn_min_distance=0,  # minimum player to target path length of the distance spawn policy
+            auto_reset=True,  # games that reach their target are reset within step()
+            observation_size=None  # (w, h) of uint8 image observations rasterized at that size, the screen size if None
+        )
+        """
+        self.options = dict(
+            algorithm="randomized_prim",
+            seed=None,
+            pool_size=None,
+            spawn="corners",
+            spawn_min_distance=0,
+            auto_reset=True,
+            observation_size=None
+        )
+        if options:
+            self.options.update(options)
+
+        self.n = n
+        self.width, self.height = maze_size
+        self.screen_width, self.screen_height = screen_size
+        self.tile_width, self.tile_height = ceil(screen_size[0] / maze_size[0]), ceil(screen_size[1] / maze_size[1])
+        self.random = np.random.default_rng(self.options["seed"])
+
+        self.colors = dict(
+            goal=(255, 0, 0),
+            player=(0, 255, 0),
+            wall=(255, 255, 255),
+            floor=(0, 0, 0)
+        )
+        self.colors.update(colors if colors else {})
+        self.palette = np.array([self.colors[name] for name in PALETTE_COLORS] + [(105, 105, 105)], dtype=np.uint8)
+        self._weights = None
+
+        # Per-game state
+        rows = np.arange(n)
+        self.rows = rows
+        self.maze_index = np.zeros(n, dtype=np.int64)
+        self.player = np.zeros((n, 2), dtype=np.int64)
+        self.target = np.zeros((n, 2), dtype=np.int64)
+        self.player_steps = np.zeros(n, dtype=np.int64)
+        self.terminal = np.zeros(n, dtype=bool)
+
+        self.pool_grids = None
+        self.pool_player = None
+        self.pool_target = None
+        self.pool_optimal = None
+        self.refresh_pool()
+
+        deltas = np.array(ACTION_DELTAS, dtype=np.int64)
+        self._dx, self._dy = deltas[:, 0], deltas[:, 1]
+
+    def refresh_pool(self):
+        """
+        Generates and solves a new maze pool and resets every game into it
+        :return: None
+        """
+        pool_size = self.options["pool_size"] or self.n
+        seed = int(self.random.integers(2 ** 63))
+        self.pool_grids = generate_batch(pool_size, self.width, self.height, algorithm=self.options["algorithm"],
+                                         seed=seed)
+
+        spawns = []
+        for i, grid in enumerate(self.pool_grids):
+            maze = Maze(width=self.width, height=self.height, maze_algorithm=self.options["algorithm"], grid=grid,
+                        spawn=self.options["spawn"], spawn_min_distance=self.options["spawn_min_distance"])
+            maze.random.seed(seed + i)
+            spawns.append(maze.spawn_players())
+
+        self.pool_player = np.array([player for player, _ in spawns], dtype=np.int64)
+        self.pool_target = np.array([target for _, target in spawns], dtype=np.int64)
+        self.pool_optimal = batch_distances(self.pool_grids, self.pool_player, self.pool_target)
+        self.reset_games(self.rows)
+
+    def reset_games(self, games):
+        """
+        Moves games to a random maze of the pool
+        :param games: integer or boolean index of the games
+        :return: None
+        """
+        games = self.rows[games]
+        self.maze_index[games] = self.random.integers(len(self.pool_grids), size=len(games))
+        self.player[games] = self.pool_player[self.maze_index[games]]
+        self.target[games] = self.pool_target[self.maze_index[games]]
+        self.player_steps[games] = 0
+        self.terminal[games] = False
+
+    def reset(self, type=StateType.Array):
+        """
+        Resets every game
+        :return: The batched state
+        """
+        self.reset_games(self.rows)
+        return self.get_state(type=type)
+
+    @property
+    def grids(self):
+        """
+        Grid of every game, numpy array of shape (n, width, height)
+        """
+        return self.pool_grids[self.maze_index]
+
+    @property
+    def optimal_steps(self):
+        """
+        Shortest path length from the spawn position to the target of every game
+        """
+        return self.pool_optimal[self.maze_index]
+
+    def get_state(self, type=StateType.Array):
+        """
+        Retrieve the batched state representation
+        :param type: the StateType
+        :return: A numpy array with the state of every game along the first axis
+        """
+        rows = self.rows
+        if type == StateType.Array or type == StateType.ArrayFlat:
+            state = self.grids
+            state[rows, self.player[:, 0], self.player[:, 1]] = 2
+            state[rows, self.target[:, 0], self.target[:, 1]] = 3
+            return state.reshape(self.n, -1) if type == StateType.ArrayFlat else state
+
+        elif type == StateType.ImageRGB or type == StateType.ImageGrayScale:
+            indices = np.where(self.grids == 0, WALL, FLOOR).astype(np.uint8)
+            indices[rows, self.target[:, 0], self.target[:, 1]] = GOAL
+            indices[rows, self.player[:, 0], self.player[:, 1]] = PLAYER
+            grayscale = type == StateType.ImageGrayScale
+
+            if self.options["observation_size"]:
+                if self._weights is None:
+                    size = self.options["observation_size"]
+                    self._weights = (
+                        area_weights(self.width, self.tile_width, self.screen_width, size[0]),
+                        area_weights(self.height, self.tile_height, self.screen_height, size[1])
+                    )
+                state = rasterize(indices, self.palette, *self._weights, grayscale=grayscale)
+            else:
+                state = np.repeat(self.palette[indices], self.tile_width, axis=1)[:, :self.screen_width]
+                state = np.repeat(state, self.tile_height, axis=2)[:, :, :self.screen_height]
+                if grayscale:
+                    from skimage import color
+                    state = color.rgb2gray(state)
+
+            return state[:, :, ::-1]
+        else:
+            raise RuntimeError("Unknown Type")
+
+    def step(self, actions, type=StateType.Array):
+        """
+        Steps every game. With auto_reset, games that reach their target are reset and their returned state is the
+        first state of the next episode
+        :param actions: integer array of shape (n, ) with actions from 0 - 3
+        :return: s, r, t, info where r and t are arrays of shape (n, ) and info holds arrays of optimal_steps and
+        step_count of the finished episodes
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.n, ) or ((actions < 0) | (actions > 3)).any():
+            raise RuntimeError("Actions must be %s integer values between 0 and 3" % self.n)
+
+        # Finished games do not move and keep returning a reward of 1, like MazeGame.step()
+        next_x = self.player[:, 0] + self._dx[actions]
+        next_y = self.player[:, 1] + self._dy[actions]
+        legal = (next_x >= 0) & (next_x < self.width) & (next_y >= 0) & (next_y < self.height) & ~self.terminal
+        legal[legal] = self.pool_grids[self.maze_index[legal], next_x[legal], next_y[legal]] == 0
+
+        self.player[legal, 0] = next_x[legal]
+        self.player[legal, 1] = next_y[legal]
+        self.player_steps += legal
+
+        self.terminal = (self.player == self.target).all(axis=1)
+        rewards = np.where(self.terminal, 1.0, -0.01)
+        terminal = self.terminal.copy()
+
+        info = dict(
+            optimal_steps=self.optimal_steps,
+            step_count=self.player_steps.copy()
+        )
+
+        if self.options["auto_reset"] and self.terminal.any():
+            self.reset_games(self.terminal)
+
+        return self.get_state(type=type), rewards, terminal, info
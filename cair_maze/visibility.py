@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import numpy as np
+
+# Tables of keyed mazes, shared by every game that resets into the same maze
+_TABLES = OrderedDict()
+_TABLES_SIZE = 64
+
+
+def line_of_sight(grid, vision):
+    """
+    Tiles visible from every open tile, following the rays of POMDPLimitedMaze. The player looks along the four axes
+    (vision - 1 tiles towards +x and +y, vision tiles towards -x and -y), a ray stops at the first wall, and walls
+    beside every open tile on a ray are visible too
+    :param grid: numpy array of shape (width, height) (1 = wall, 0 = open)
+    :param vision: the vision of the mechanic
+    :return: tuple of (indptr, indices) in CSR layout. The tiles visible from flat index c = x * height + y are
+    indices[indptr[c]:indptr[c + 1]], as sorted flat indices
+    """
+    grid = np.asarray(grid)
+    width, height = grid.shape
+    is_wall = grid == 1
+    xs, ys = np.nonzero(~is_wall)
+
+    # Pairs of (viewer, visible tile) as flat indices
+    viewers, seen = [], []
+
+    def add(mask, x, y):
+        viewers.append((xs * height + ys)[mask])
+        seen.append((x * height + y)[mask])
+
+    for (dx, dy), first, last in (((1, 0), 0, vision - 1), ((-1, 0), 1, vision),
+                                  ((0, 1), 0, vision - 1), ((0, -1), 1, vision)):
+        # Tiles beside the ray, perpendicular to it
+        sx, sy = dy, dx
+        ray = np.ones(len(xs), dtype=bool)
+
+        for k in range(first, last + 1):
+            x, y = xs + k * dx, ys + k * dy
+            ray &= (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            if not ray.any():
+                break
+
+            cx, cy = np.clip(x, 0, width - 1), np.clip(y, 0, height - 1)
+            add(ray, cx, cy)
+
+            open_tile = ray & ~is_wall[cx, cy]
+            for side in (-1, 1):
+                side_x, side_y = cx + side * sx, cy + side * sy
+                inside = (side_x >= 0) & (side_x < width) & (side_y >= 0) & (side_y < height)
+                side_x, side_y = np.clip(side_x, 0, width - 1), np.clip(side_y, 0, height - 1)
+                add(open_tile & inside & is_wall[side_x, side_y], side_x, side_y)
+
+            # The ray continues past open tiles only
+            ray = open_tile
+
+    size = width * height
+    pairs = np.unique(np.concatenate(viewers).astype(np.int64) * size + np.concatenate(seen)) if viewers else \
+        np.empty(0, dtype=np.int64)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs // size, minlength=size), out=indptr[1:])
+    return indptr, (pairs % size).astype(np.int32)
+
+
+def line_of_sight_table(maze, vision):
+    """
+    line_of_sight() of a maze. Mazes with a key (seeded and corpus mazes) share their table across resets
+    :param maze: Maze instance
+    :param vision: the vision of the mechanic
+    :return: tuple of (indptr, indices), see line_of_sight()
+    """
+    if maze.key is None:
+        return line_of_sight(maze.grid, vision)
+
+    key = (maze.key, vision)
+    if key in _TABLES:
+        _TABLES.move_to_end(key)
+    else:
+        _TABLES[key] = line_of_sight(maze.grid, vision)
+        if len(_TABLES) > _TABLES_SIZE:
+            _TABLES.popitem(last=False)
+    return _TABLES[key]
+
+
+def seen_from(table, cell):
+    """
+    Bitset of the tiles that see a given tile
+    :param table: tuple of (indptr, indices), see line_of_sight()
+    :param cell: flat index of the tile
+    :return: uint8 numpy array of packed bits, bit c is set when tile c sees the tile
+    """
+    indptr, indices = table
+    viewers = np.searchsorted(indptr, np.flatnonzero(indices == cell), side="right") - 1
+    bits = np.zeros(len(indptr) - 1, dtype=bool)
+    bits[viewers] = True
+    return np.packbits(bits)
+
+
+def has_bit(bitset, cell):
+    """
+    :param bitset: uint8 numpy array of packed bits
+    :param cell: bit index
+    :return: Boolean
+    """
+    return bool((bitset[cell >> 3] >> (7 - (cell & 7))) & 1)
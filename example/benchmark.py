@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+from cair_maze.algorithms import ALGORITHMS, generate_batch
+from cair_maze.maze import Maze
+from cair_maze.vector import VectorMazeGame
+
+
+def bench_generation(sizes=(11, 41, 101, 301, 1001), repeat=5, algorithm="randomized_prim"):
+    """
+    Measures maze generation latency. The time per cell should stay flat when the generator is linear
+    :param sizes: list of maze widths (the mazes are square)
+    :param repeat: number of mazes generated per size
+    :param algorithm: the generator algorithm
+    :return: None
+    """
+    for size in sizes:
+        now = time.perf_counter()
+        for _ in range(repeat):
+            Maze(width=size, height=size, maze_algorithm=algorithm)
+        elapsed = (time.perf_counter() - now) / repeat
+        print("%-24s %5sx%-5s %10.2f ms %8.1f ns/cell" % (
+            algorithm, size, size, elapsed * 1e3, elapsed * 1e9 / (size * size)))
+
+
+def bench_batch_generation(n=1000, size=41, algorithms=("randomized_prim", "recursive_backtracking")):
+    """
+    Measures lockstep batch generation, to be compared with the per-maze numbers of bench_generation
+    :param n: number of mazes
+    :param size: maze width and height
+    :param algorithms: list of generator algorithms
+    :return: None
+    """
+    for algorithm in algorithms:
+        now = time.perf_counter()
+        generate_batch(n, size, size, algorithm=algorithm)
+        elapsed = time.perf_counter() - now
+        print("%-24s batch  %5s mazes %5sx%-5s %10.2f ms" % (algorithm, n, size, size, elapsed * 1e3))
+
+
+def bench_algorithms(size=101, repeat=5):
+    """
+    Measures the throughput of every generator algorithm on the same maze size
+    :param size: maze width and height
+    :param repeat: number of mazes generated per algorithm
+    :return: None
+    """
+    for algorithm in ALGORITHMS:
+        now = time.perf_counter()
+        for _ in range(repeat):
+            Maze(width=size, height=size, maze_algorithm=algorithm)
+        elapsed = (time.perf_counter() - now) / repeat
+        print("%-24s %5sx%-5s %10.2f ms %8.1f mazes/s" % (algorithm, size, size, elapsed * 1e3, 1 / elapsed))
+
+
+def bench_vector_steps(n=4096, size=11, steps=200):
+    """
+    Measures the step throughput of VectorMazeGame with Array observations
+    :param n: number of games
+    :param size: maze width and height
+    :param steps: number of batched steps
+    :return: None
+    """
+    game = VectorMazeGame(n, (size, size), options=dict(pool_size=1024))
+    actions = np.random.randint(0, 4, size=(steps, n))
+
+    now = time.perf_counter()
+    for a in actions:
+        game.step(a)
+    elapsed = time.perf_counter() - now
+    print("vector %5s games %5sx%-5s %10.2f M steps/s" % (n, size, size, steps * n / elapsed / 1e6))
+
+
+def bench_import(modules=("cair_maze.maze_game", "gym_maze"), repeat=5):
+    """
+    Measures the import time of modules in fresh interpreters, after gym is already imported, which is what every
+    worker process pays at startup
+    :param modules: list of module names
+    :param repeat: number of interpreters per module
+    :return: None
+    """
+    script = "import time, gym; now = time.perf_counter(); import %s; print(time.perf_counter() - now)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                       os.environ.get("PYTHONPATH", "")]))
+    for module in modules:
+        elapsed = min(
+            float(subprocess.run([sys.executable, "-c", script % module], env=env, check=True, capture_output=True,
+                                 text=True).stdout)
+            for _ in range(repeat)
+        )
+        print("import %-24s %10.2f ms" % (module, elapsed * 1e3))
+
+
+if __name__ == "__main__":
+    bench_import()
+    bench_generation()
+    bench_algorithms()
+    bench_batch_generation()
+    bench_vector_steps()
@@ -24,33 +24,13 @@ if __name__ == "__main__":
 
     # Direct initialization
     m = MazeGame((32, 32), mechanic=MazeGame.NormalMaze, mechanic_args=dict(vision=3))
-    path = list(reversed(m.maze_optimal_path[1]))
-
-    fps = 0
-    path.pop()
 
     while True:
-        nx, ny = path.pop()
-        px, py = m.player
-        dx, dy = nx - px, ny - py
-
-        if dx == 1:
-            a = 3
-        elif dx == -1:
-            a = 2
-        elif dy == 1:
-            a = 0
-        elif dy == -1:
-            a = 1
-        else:
-            Exception("omg")
+        # Follow the optimal path by reading the expert action of the current tile
+        a = m.optimal_action()
 
         m.render()
         data = m.step(a)
         m.render()
         if m.terminal:
             m.reset()
-            path = list(reversed(m.maze_optimal_path[1]))
-
-            path.pop()
-
@@ -1,5 +1,7 @@
-from gym.envs.registration import register
-import gym_maze.envs.maze_env
+import gym
+from gym.envs.registration import register, registry
+import gym_maze.envs
+from cair_maze.mechanics import MECHANICS
 
 
 class StateWrapper:
@@ -8,8 +10,7 @@ class StateWrapper:
         self.type = type
 
     def reset(self):
-        self.env.reset()
-        return self.render()
+        return self.env.reset(type=self.type)
 
     def render(self):
         return self.env.render(mode=self.type)
@@ -53,62 +54,39 @@ class StateResizeWrapper:
 
 
 
-cls_mg = gym_maze.envs.maze_env.MazeGame
-cls_base = gym_maze.envs.maze_env.MazeEnv
+def register_env(id):
+    """
+    Registers a maze environment id of any size with gym, see gym_maze.envs.env_spec()
+    :param id: the environment id, for example Maze-101x101-POMDPMaze-v0
+    :return: Boolean, False if the id is not a maze environment
+    """
+    if id in registry:
+        return True
 
-sizes = [(a, a) for a in range(5, 56)]
-mechanics = [
-    [cls_mg.NormalMaze, [dict()]],
-    [cls_mg.POMDPMaze, [dict(vision=3, show_target=False)]],
-    [cls_mg.POMDPLimitedMaze, [dict(vision=3, show_target=False)]],
-    [cls_mg.TimedPOMDPMaze, [dict(vision=3, show_target=False, delay=5)]],
-    [cls_mg.TimedPOMDPLimitedMaze, [dict(vision=3, show_target=False, delay=5)]]
-]
+    spec = gym_maze.envs.env_spec(id)
+    if spec is None:
+        return False
 
+    entry_point, kwargs = spec
+    register(id=id, entry_point=entry_point, kwargs=kwargs)
+    return True
 
-def make_constructor(args):
-    def constructor(self):
-        super(self.__class__, self).__init__(*args)
 
-    return constructor
+def make(id, **kwargs):
+    """
+    gym.make() that registers maze environment ids of any size on demand
+    :param id: the environment id
+    :param kwargs: sent to gym.make()
+    :return: the environment
+    """
+    register_env(id)
+    return gym.make(id, **kwargs)
 
 
-for size in sizes:
-    for mechanic, mechanic_args in mechanics:
-        for mechanic_arg in mechanic_args:
-            data = (size[0], size[1], str(mechanic.__name__))
-            cls_name = "Maze%sx%s%sEnv" % data
-            cls_id = "Maze-%sx%s-%s-v0" % data  # maze-11x11-deterministic-v0
-            cls_constructor = make_constructor(args=(*size, mechanic, mechanic_arg))
+# The common sizes are registered up front for gym.make(), the environments are only built when made
+for size in range(5, 56):
+    for name in MECHANICS:
+        register_env("Maze-%sx%s-%s-v0" % (size, size, name))  # Maze-11x11-NormalMaze-v0
 
-            cls = type(cls_name, (cls_base,), {
-                "__init__": cls_constructor
-            })
-            cls.id = cls_id
-            register(
-                id=cls.id,
-                entry_point='gym_maze.envs:%s' % cls_name
-            )
-
-            setattr(gym_maze.envs, cls_name, cls)
-
-# NoMaze Environment
-
-sizes = [(a, a) for a in range(2, 56, 2)]
-cls_base = gym_maze.envs.NoMazeEnv
-for size in sizes:
-    # Register NoMaze Environments
-    data = (size[0], size[1])
-    cls_name = "NoMaze%sx%sEnv" % data
-    cls_id = "NoMaze-%sx%s-v0" % data  # maze-11x11-deterministic-v0
-    cls_constructor = make_constructor(args=(*size, ))
-    cls = type(cls_name, (cls_base,), {
-        "__init__": cls_constructor
-    })
-    cls.id = cls_id
-    register(
-        id=cls.id,
-        entry_point='gym_maze.envs:%s' % cls_name
-    )
-
-    setattr(gym_maze.envs, cls_name, cls)
+for size in range(2, 56, 2):
+    register_env("NoMaze-%sx%s-v0" % (size, size))  # NoMaze-10x10-v0
@@ -1,3 +1,79 @@
-from gym_maze.envs.maze_env import *
-from gym_maze.envs.no_maze_env import *
+import re
+from importlib import import_module
 
+# Environment classes, imported on first access so that importing gym_maze does not load cair_maze.maze_game
+_CLASSES = dict(
+    MazeEnv="gym_maze.envs.maze_env",
+    NoMazeEnv="gym_maze.envs.no_maze_env",
+    MazeVecEnv="gym_maze.envs.maze_vec_env",
+    MazeSubprocVecEnv="gym_maze.envs.maze_vec_env"
+)
+
+MAZE_ID = re.compile(r"^Maze-([1-9]\d*)x([1-9]\d*)-(\w+)-v0$")  # Maze-11x11-NormalMaze-v0
+NO_MAZE_ID = re.compile(r"^NoMaze-([1-9]\d*)x([1-9]\d*)-v0$")  # NoMaze-10x10-v0
+MAZE_CLASS = re.compile(r"^Maze([1-9]\d*)x([1-9]\d*)(\w+)Env$")  # Maze11x11NormalMazeEnv
+NO_MAZE_CLASS = re.compile(r"^NoMaze([1-9]\d*)x([1-9]\d*)Env$")  # NoMaze10x10Env
+
+__all__ = list(_CLASSES)
+
+
+def env_spec(id):
+    """
+    Parses an environment id of any size from 1x1 up, Maze-{W}x{H}-{Mechanic}-v0 or NoMaze-{W}x{H}-v0
+    :param id: the environment id
+    :return: tuple of (entry point, kwargs) for gym registration, None if the id is not a maze environment
+    """
+    from cair_maze.mechanics import MECHANICS
+
+    match = MAZE_ID.match(id)
+    if match and match.group(3) in MECHANICS:
+        width, height, name = match.groups()
+        return "gym_maze.envs.maze_env:MazeEnv", dict(
+            width=int(width), height=int(height), mechanic=name, mechanic_args=MECHANICS[name].default_args
+        )
+
+    match = NO_MAZE_ID.match(id)
+    if match:
+        width, height = match.groups()
+        return "gym_maze.envs.no_maze_env:NoMazeEnv", dict(width=int(width), height=int(height))
+    return None
+
+
+def _legacy_class(name):
+    """
+    Builds the Maze{W}x{H}{Mechanic}Env and NoMaze{W}x{H}Env classes, which are subclasses with the constructor
+    arguments of their id bound
+    :return: the class, None if the name is not a legacy class name
+    """
+    match = NO_MAZE_CLASS.match(name)
+    if match:
+        id = "NoMaze-%sx%s-v0" % match.groups()
+    else:
+        match = MAZE_CLASS.match(name)
+        id = "Maze-%sx%s-%s-v0" % match.groups() if match else None
+
+    spec = env_spec(id) if id else None
+    if spec is None:
+        return None
+
+    entry_point, kwargs = spec
+    base = __getattr__(entry_point.split(":")[1])
+
+    def constructor(self):
+        base.__init__(self, **kwargs)
+
+    cls = type(name, (base, ), {"__init__": constructor})
+    cls.id = id
+    return cls
+
+
+def __getattr__(name):
+    if name in _CLASSES:
+        value = getattr(import_module(_CLASSES[name]), name)
+    else:
+        value = _legacy_class(name)
+        if value is None:
+            raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    globals()[name] = value
+    return value
@@ -1,5 +1,5 @@
 import gym
-from cair_maze.maze_game import MazeGame
+from cair_maze.maze_game import MazeGame, StateType
 
 
 class MazeEnv(gym.Env):
@@ -13,11 +13,11 @@ class MazeEnv(gym.Env):
         self.observation_space = self.env.get_state().shape
         self.action_space = 4
 
-    def step(self, action, type):
+    def step(self, action, type=StateType.DEFAULT):
         return self.env.step(action, type)
 
-    def reset(self):
-        return self.env.reset()
+    def reset(self, type=StateType.DEFAULT):
+        return self.env.reset(type=type)
 
     def render(self, mode=0, close=False):
         if close:
@@ -25,3 +25,12 @@ class MazeEnv(gym.Env):
             return None
 
         return self.env.render(type=mode)
+
+    def memory_map(self):
+        """
+        Remembered map of the episode, see cair_maze.mechanics.POMDPExploredMaze.memory_map()
+        :return: uint8 numpy array of shape (width, height)
+        """
+        if not hasattr(self.env.mechanic, "memory_map"):
+            raise ValueError("%s keeps no memory of the maze" % type(self.env.mechanic).__name__)
+        return self.env.mechanic.memory_map()
@@ -0,0 +1,87 @@
+import gym
+from cair_maze.maze_game import StateType
+from cair_maze.vector import VectorMazeGame
+from cair_maze.subproc import SubprocessMazeGame
+
+
+class MazeVecEnv(gym.Env):
+    metadata = {'render.modes': ['human']}
+    id = "maze-vec-v0"
+
+    def __init__(self, num_envs, width, height, type=StateType.Array, options=None):
+        """
+        Vectorized NormalMaze environments, see cair_maze.vector.VectorMazeGame
+        :param num_envs: number of environments
+        :param width: width of the mazes
+        :param height: height of the mazes
+        :param type: the StateType of the observations
+        :param options: options of VectorMazeGame
+        """
+        self.env = VectorMazeGame(num_envs, (width, height), options=options)
+        self.num_envs = num_envs
+        self.type = type
+
+        self.observation_space = self.env.get_state(type).shape[1:]
+        self.action_space = 4
+
+    def step(self, actions):
+        return self.env.step(actions, self.type)
+
+    def reset(self):
+        return self.env.reset(self.type)
+
+    def render(self, mode=0, close=False):
+        if close:
+            return None
+
+        return self.env.get_state(mode)
+
+
+class MazeSubprocVecEnv(gym.Env):
+    metadata = {'render.modes': ['human']}
+    id = "maze-subproc-vec-v0"
+
+    def __init__(self, num_envs, width, height, mechanic, mechanic_args=None, type=StateType.Array, options=None,
+                 workers=None):
+        """
+        Environments of any mechanic stepped by worker processes, see cair_maze.subproc.SubprocessMazeGame
+        :param num_envs: number of environments
+        :param width: width of the mazes
+        :param height: height of the mazes
+        :param mechanic: mechanic class or registered name
+        :param mechanic_args: A dict of properties sent to the mechanic class
+        :param type: the StateType of the observations
+        :param options: options of every MazeGame
+        :param workers: number of worker processes, defaults to the number of cores
+        """
+        self.env = SubprocessMazeGame(num_envs, (width, height), mechanic=mechanic, mechanic_args=mechanic_args,
+                                      options=options, type=type, workers=workers)
+        self.num_envs = num_envs
+        self.type = type
+
+        try:
+            self.observation_space = self.env.reset().shape[1:]
+        except Exception:
+            self.env.close()
+            raise
+        self.action_space = 4
+
+    def step_async(self, actions):
+        self.env.step_async(actions)
+
+    def step_wait(self):
+        return self.env.step_wait()
+
+    def step(self, actions):
+        return self.env.step(actions)
+
+    def reset(self):
+        return self.env.reset()
+
+    def render(self, mode=0, close=False):
+        if close:
+            self.close()
+        return None
+
+    def close(self):
+        self.env.close()
@@ -1,7 +1,7 @@
 import gym
 from gym.envs import register
 
-from cair_maze.maze_game import MazeGame
+from cair_maze.maze_game import MazeGame, StateType
 from cair_maze.mechanics import BaseMazeMechanic
 
 
@@ -33,8 +33,8 @@ class NoMazeEnv(gym.Env):
     def step(self, action, type):
         return self.env.step(action, type)
 
-    def reset(self):
-        return self.env.reset()
+    def reset(self, type=StateType.DEFAULT):
+        return self.env.reset(type=type)
 
     def render(self, mode=0, close=False):
         if close:
@@ -0,0 +1,53 @@
+import os
+
+from cair_maze.corpus import MazeCorpus
+from cair_maze.maze_game import MazeGame
+from cair_maze.subproc import SubprocessMazeGame
+
+
+def records(directory):
+    corpus = MazeCorpus(directory)
+    return sum(len(seeds) for seeds, _ in corpus._segments("randomized_prim", 11, 11, refresh=True).values())
+
+
+def test_games_share_a_directory(tmp_path):
+    directory = str(tmp_path)
+    games = [MazeGame((11, 11), options=dict(corpus=directory, seed=seed)) for seed in (1, 2)]
+    for game in games:
+        for _ in range(4):
+            game.reset(type=2)
+    for game in games:
+        game.quit()
+
+    # 5 mazes per game, the constructor resets once
+    assert records(directory) == 10
+
+    # A new game with the same seed finds every maze
+    game = MazeGame((11, 11), options=dict(corpus=directory, seed=2))
+    assert game.maze.cached
+    for _ in range(4):
+        game.reset(type=2)
+        assert game.maze.cached
+
+
+def test_segments_are_merged(tmp_path):
+    directory = str(tmp_path)
+    corpus = MazeCorpus(directory, flush_every=1, max_segments=4)
+    game = MazeGame((11, 11), options=dict(corpus=corpus, seed=3))
+    for _ in range(9):
+        game.reset(type=2)
+    game.quit()
+
+    assert len(os.listdir(directory)) <= 4
+    assert records(directory) == 10
+    assert not corpus._pending
+
+
+def test_subprocess_workers_share_a_corpus(tmp_path):
+    directory = str(tmp_path)
+    games = SubprocessMazeGame(4, (11, 11), options=dict(corpus=MazeCorpus(directory), seed=10), workers=2)
+    games.reset()
+    games.close()
+
+    # Per game one maze from the constructor and one from the reset
+    assert records(directory) == 8
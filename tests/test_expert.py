@@ -0,0 +1,26 @@
+import numpy as np
+
+from cair_maze.expert import expert_transitions
+from cair_maze.maze_game import MazeGame
+
+
+def test_expert_skips_episodes_without_optimal_action():
+    game = MazeGame((5, 5), options=dict(spawn="random", seed=1))
+
+    # Every other episode spawns the player on the target, where optimal_action() is NO_ACTION
+    spawn_players = game.spawn_players
+    resets = []
+
+    def spawn_on_target():
+        player, target = spawn_players()
+        resets.append(target)
+        return (target, target) if len(resets) % 2 else (player, target)
+
+    game.spawn_players = spawn_on_target
+
+    chunks = [chunk.actions.copy() for chunk in expert_transitions(game, n_steps=500, chunk_size=128)]
+    actions = np.concatenate(chunks)
+
+    assert len(actions) == 500
+    assert actions.max() <= 3
+    assert len(resets) > 2
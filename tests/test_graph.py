@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+
+from cair_maze.graph import CorridorGraph
+from cair_maze.maze import Maze
+from cair_maze.pathfinding import adjacency, distance_field
+
+
+def perfect_grid(size, seed):
+    return np.asarray(Maze(width=size, height=size, seed=seed).grid)
+
+
+def braided_grid(size, seed):
+    # Removing walls between two open tiles adds cycles to a perfect maze
+    grid = perfect_grid(size, seed).copy()
+    rng = random.Random(seed)
+    walls = [(x, y) for x in range(1, size - 1) for y in range(1, size - 1) if grid[x, y] == 1 and
+             ((grid[x - 1, y] == 0 and grid[x + 1, y] == 0) or (grid[x, y - 1] == 0 and grid[x, y + 1] == 0))]
+    for x, y in rng.sample(walls, len(walls) // 4):
+        grid[x, y] = 0
+    return grid
+
+
+def open_grid(size, seed):
+    grid = np.zeros((size, size), dtype=np.uint8)
+    grid[size // 2, 1:size - 1] = 1
+    return grid
+
+
+def query_pairs(graph, grid, seed, n=60):
+    """
+    Random pairs plus pairs on one corridor, between junction tiles and of a tile with itself
+    """
+    rng = random.Random(seed)
+    cells = np.flatnonzero(grid.ravel() == 0).tolist()
+    degree = (adjacency(grid) >= 0).sum(axis=1)
+    junctions = [cell for cell in cells if degree[cell] >= 3]
+
+    pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(n)]
+    pairs += [(rng.choice(junctions), rng.choice(junctions)) for _ in range(n // 4 if junctions else 0)]
+    pairs += [(junction, rng.choice(cells)) for junction in junctions[:n // 4]]
+    pairs += [(cell, cell) for cell in cells[:5]]
+
+    for edge in range(min(len(graph.edges), n // 4)):
+        tiles = graph.edges[edge][3]
+        if len(tiles) >= 2:
+            pairs.append((tiles[0], tiles[-1]))
+            pairs.append((rng.choice(tiles), rng.choice(tiles)))
+
+    height = grid.shape[1]
+    return [(divmod(a, height), divmod(b, height)) for a, b in pairs]
+
+
+def check_against_bfs(grid, seed):
+    graph = CorridorGraph(grid)
+    for a, b in query_pairs(graph, grid, seed):
+        expected = int(distance_field(grid, b)[a])
+        length = graph.shortest_path_length(a, b)
+        assert length == expected, (a, b)
+
+        found, path = graph.shortest_path(a, b)
+        assert found == expected
+        assert path[0] == a and path[-1] == b
+        assert len(path) == expected + 1
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            assert abs(x0 - x1) + abs(y0 - y1) == 1
+            assert grid[x1, y1] == 0
+    return graph
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_perfect_maze_uses_tree_routes(seed):
+    graph = check_against_bfs(perfect_grid(21, seed), seed)
+    assert graph.is_forest
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_braided_maze_uses_dijkstra(seed):
+    graph = check_against_bfs(braided_grid(21, seed), seed)
+    assert not graph.is_forest
+
+
+def test_open_grid_uses_dijkstra():
+    graph = check_against_bfs(open_grid(9, 0), 0)
+    assert not graph.is_forest
+
+
+def test_ring_of_corridor_tiles():
+    # Every tile of the ring has two neighbours, so one of them is promoted to a node
+    grid = np.ones((7, 7), dtype=np.uint8)
+    grid[1:6, 1:6] = 0
+    grid[2:5, 2:5] = 1
+    graph = check_against_bfs(grid, 0)
+    assert len(graph.nodes) == 1
+
+
+def test_disconnected_tiles_have_no_path():
+    grid = np.ones((5, 5), dtype=np.uint8)
+    grid[0, 0:3] = 0
+    grid[4, 2:5] = 0
+    graph = CorridorGraph(grid)
+
+    assert not graph.reachable((0, 0), (4, 4))
+    assert graph.shortest_path_length((0, 0), (4, 4)) is None
+    assert graph.shortest_path((0, 0), (4, 4)) is None
+    assert graph.shortest_path_length((0, 0), (0, 2)) == 2
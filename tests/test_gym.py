@@ -0,0 +1,26 @@
+import pytest
+
+import gym_maze
+
+
+def test_memory_map_through_gym():
+    env = gym_maze.make("Maze-11x11-POMDPExploredMaze-v0", disable_env_checker=True)
+    env.reset(type=2)
+    memory = env.unwrapped.memory_map()
+    assert memory.shape == (11, 11)
+    assert (memory == 4).any()
+
+    explored = (memory != 4).sum()
+    for action in [0, 3] * 10:
+        env.step(action)
+    memory = env.unwrapped.memory_map()
+    assert (memory != 4).sum() >= explored
+    assert (memory == 2).sum() == 1
+
+
+def test_memory_map_without_memory():
+    env = gym_maze.make("Maze-11x11-NormalMaze-v0", disable_env_checker=True)
+    env.reset(type=2)
+    with pytest.raises(ValueError):
+        env.unwrapped.memory_map()
+
@@ -0,0 +1,24 @@
+from cair_maze.maze_game import MazeGame
+from cair_maze.packed import generate_packed
+
+
+def play_optimally(game, limit=10000):
+    for _ in range(limit):
+        _, reward, terminal, _ = game.step(game.optimal_action(), type=2)
+        if terminal:
+            return reward
+    return None
+
+
+def test_maze_file_size_replaces_maze_size(tmp_path):
+    path = str(tmp_path / "maze.cmz")
+    generate_packed(path, 31, 21, seed=3)
+
+    for mechanic in ("NormalMaze", "POMDPMaze", "POMDPLimitedMaze"):
+        game = MazeGame((11, 11), mechanic=mechanic, options=dict(maze_file=path))
+        assert (game.width, game.height) == (31, 21)
+        assert game.target == (30, 20)
+        assert game.get_state(type=2).shape == (31, 21)
+        assert play_optimally(game) == 1
+        assert game.player_steps == game.maze_optimal_path_length
+        assert game.get_state(type=0).shape == (640, 480, 3)
@@ -0,0 +1,38 @@
+import pytest
+
+from cair_maze.maze_game import MazeGame
+from cair_maze.mechanics import BaseMazeMechanic, MECHANICS, register_mechanic
+
+
+@register_mechanic(name="test-counting")
+class CountingMaze(BaseMazeMechanic):
+    # A user mechanic whose constructor only takes the game
+    def __init__(self, game):
+        super().__init__(game)
+        self.updates = 0
+
+    def on_start(self):
+        pass
+
+    def on_update(self):
+        self.updates += 1
+
+    def on_terminal(self):
+        pass
+
+
+def test_mechanic_without_kwargs():
+    game = MazeGame((7, 7), mechanic="test-counting")
+    game.step(0, type=2)
+    assert isinstance(game.mechanic, CountingMaze)
+
+
+def test_mechanic_outside_of_maze_game():
+    game = MazeGame((7, 7))
+    with pytest.raises(ImportError):
+        CountingMaze(game)
+
+
+def test_registered_name_uses_default_args():
+    game = MazeGame((11, 11), mechanic="POMDPMaze")
+    assert game.mechanic.vision == MECHANICS["POMDPMaze"].default_args["vision"]